@@ -1,5 +1,5 @@
 import os
-from milkypy import MilkyClient, Text, Reply
+from milkypy import MilkyClient, MessageEvent, Text, Reply
 import logging
 from datetime import datetime
 import asyncio
@@ -25,12 +25,12 @@ bot = MilkyClient(
 
 # 监听消息事件
 @bot.on("message_receive")
-async def handle_message(self: MilkyClient, event: dict, self_id: int, time: int):
+async def handle_message(self: MilkyClient, event: MessageEvent, self_id: int, time: int):
     """
     处理接收到的消息。
     """
-    # 提取纯文本内容
-    content = "".join([segment["data"]["text"] for segment in event["segments"] if segment["type"] == "text"])
+    # 提取纯文本内容（消息事件为 MessageEvent，结果在处理器之间共享）
+    content = event.plain_text
     
     peer_id = event["peer_id"]
     message_scene = event["message_scene"]
@@ -1,4 +1,5 @@
 from .client import MilkyClient
+from .event import MessageEvent
 from .message import (
     Text, 
     Mention, 
@@ -8,11 +9,13 @@ from .message import (
     Image, 
     Record, 
     Video, 
-    Forward
+    Forward,
+    Message,
 )
 
 __all__ = [
     "MilkyClient",
+    "MessageEvent",
     "Text",
     "Mention",
     "MentionAll",
@@ -22,4 +25,5 @@ __all__ = [
     "Record",
     "Video",
     "Forward",
+    "Message",
 ]
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Union
+
+logger = logging.getLogger("milkypy")
+
+class EventBatcher:
+    """
+    事件批处理器
+
+    按分组键缓冲同类事件，当某一组累计达到 `max_size` 条，或自该组第一条事件起经过
+    `max_wait` 秒后，将整组事件一次性交给处理器。
+
+    处理器签名为 `handler(client, events, self_id, key)`，其中 `events` 为事件 `data` 的列表。
+
+    Args:
+        client (MilkyClient): 所属客户端
+        handler (Callable): 批处理器，可以是协程函数
+        max_size (int): 每批最大事件数
+        max_wait (float): 每批最长等待时间（秒）
+        key (str | Callable, 可选): 分组键，可以是事件字段名（如 "group_id"），
+            也可以是 `payload -> key` 的函数。默认为 None，即不分组。
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        handler: Callable,
+        max_size: int,
+        max_wait: float,
+        key: Optional[Union[str, Callable[[Dict[str, Any]], Hashable]]] = None,
+    ):
+        if max_size <= 0:
+            raise ValueError("max_size must be positive.")
+        self.client = client
+        self.handler = handler
+        self.max_size = max_size
+        self.max_wait = max_wait
+        if key is None:
+            self._key = lambda payload: None
+        elif isinstance(key, str):
+            self._key = lambda payload, field=key: payload.get(field)
+        else:
+            self._key = key
+        self._buffers: Dict[Hashable, List[Dict[str, Any]]] = {}
+        self._self_ids: Dict[Hashable, Any] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def add(self, payload: Dict[str, Any], self_id: Any = None):
+        """加入一条事件，必要时触发该组的投递"""
+        key = self._key(payload)
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = []
+            self._timers[key] = asyncio.get_running_loop().call_later(self.max_wait, self._flush, key)
+        buffer.append(payload)
+        self._self_ids[key] = self_id
+        if len(buffer) >= self.max_size:
+            self._flush(key)
+
+    def flush_all(self):
+        """立即投递所有未满的批次"""
+        for key in list(self._buffers):
+            self._flush(key)
+
+    async def drain(self):
+        """投递所有批次并等待处理完毕"""
+        self.flush_all()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def pending(self) -> int:
+        """尚未投递的事件数量"""
+        return sum(len(buffer) for buffer in self._buffers.values())
+
+    def _flush(self, key: Hashable):
+        events = self._buffers.pop(key, None)
+        timer = self._timers.pop(key, None)
+        self_id = self._self_ids.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        if not events:
+            return
+        task = asyncio.create_task(self._deliver(events, self_id, key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _deliver(self, events: List[Dict[str, Any]], self_id: Any, key: Hashable):
+        try:
+            if asyncio.iscoroutinefunction(self.handler):
+                await self.handler(self.client, events, self_id, key)
+            else:
+                self.handler(self.client, events, self_id, key)
+        except Exception as e:
+            logger.error(f"Failed to handle event batch: {e}")
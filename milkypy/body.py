@@ -0,0 +1,114 @@
+import asyncio
+import json
+import uuid
+from pathlib import PurePath
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from .media import StreamedFile
+from .message import Message, Segment
+
+# 参数中可以直接使用的本地媒体类型，发送前转换为 URI
+LOCAL_MEDIA = (bytes, bytearray, memoryview, PurePath)
+
+class RawJSON:
+    """
+    预先编码的 JSON 值
+
+    放在 API 参数中时，`encode_body` 将其字节原样拼接进请求体，不再重新编码。
+    适用于需要反复发送的同一内容，例如广播中的消息段列表。
+
+    Args:
+        value (Any): 要编码的值，也可以直接传入已编码的 `bytes`
+    """
+
+    __slots__ = ("encoded",)
+
+    def __init__(self, value: Any):
+        if isinstance(value, bytes):
+            self.encoded = value
+        else:
+            self.encoded = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def __len__(self) -> int:
+        return len(self.encoded)
+
+    def __repr__(self) -> str:
+        return f"RawJSON({self.encoded[:60]!r}{'...' if len(self.encoded) > 60 else ''})"
+
+async def encode_body(
+    params: Dict[str, Any],
+    resolve: Optional[Callable[[Any], Awaitable[Any]]] = None,
+) -> Tuple[Union[bytes, AsyncIterator[bytes]], Optional[int]]:
+    """
+    将 API 参数编码为 JSON 请求体
+
+    参数中的 `pathlib.Path` 与 `bytes` 通过 `resolve` 转换为 URI（或 `StreamedFile`）后再编码，
+    `RawJSON` 与已冻结的 `Message` 的字节原样拼接。参数中不含 `StreamedFile` 时返回完整的 `bytes`；否则返回逐块产出请求体的异步迭代器与请求体总长度，
+    文件内容在迭代时才被读取和编码。
+
+    Returns:
+        Tuple[bytes | AsyncIterator[bytes], int | None]: 请求体与流式请求体的长度
+    """
+    encoder = _Encoder()
+    encoded = encoder.dump(params)
+    if encoder.pending:
+        if resolve is None:
+            raise TypeError(f"Object of type {type(encoder.pending[0]).__name__} is not JSON serializable")
+        # 本地媒体只在出现时才需要第二次编码
+        values = await asyncio.gather(*(resolve(value) for value in encoder.pending))
+        encoder = _Encoder({id(source): value for source, value in zip(encoder.pending, values)})
+        encoded = encoder.dump(params)
+    if not encoder.splices:
+        return encoded, None
+
+    # 按占位符切分，得到 [JSON 片段, 拼接内容, JSON 片段, ..., JSON 片段]
+    parts: List[Union[bytes, StreamedFile]] = []
+    rest = encoded
+    for index, splice in enumerate(encoder.splices):
+        before, rest = rest.split(f'"{encoder.marker}:{index}"'.encode("ascii"), 1)
+        if isinstance(splice, StreamedFile):
+            parts.extend((before + b'"', splice))
+            rest = b'"' + rest
+        else:
+            parts.extend((before, splice.encoded))
+    parts.append(rest)
+
+    if not any(isinstance(part, StreamedFile) for part in parts):
+        return b"".join(parts), None
+    length = sum(part.encoded_length if isinstance(part, StreamedFile) else len(part) for part in parts)
+    return _stream(parts), length
+
+class _Encoder:
+    def __init__(self, resolved: Optional[Dict[int, Any]] = None):
+        self.resolved = resolved or {}
+        self.pending: List[Any] = []
+        self.splices: List[Union[StreamedFile, RawJSON]] = []
+        self.marker = uuid.uuid4().hex
+
+    def dump(self, params: Dict[str, Any]) -> bytes:
+        return json.dumps(params, ensure_ascii=False, separators=(",", ":"), default=self.default).encode("utf-8")
+
+    def default(self, value: Any) -> Any:
+        if isinstance(value, Message):
+            if value.encoded is None:
+                return value.to_list()
+            value = RawJSON(value.encoded)
+        if isinstance(value, Segment):
+            return value.to_dict()
+        if isinstance(value, (StreamedFile, RawJSON)):
+            self.splices.append(value)
+            return f"{self.marker}:{len(self.splices) - 1}"
+        if isinstance(value, LOCAL_MEDIA):
+            if id(value) in self.resolved:
+                return self.resolved[id(value)]
+            self.pending.append(value)
+            return None
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+async def _stream(parts: List[Union[bytes, StreamedFile]]) -> AsyncIterator[bytes]:
+    for part in parts:
+        if isinstance(part, StreamedFile):
+            async for chunk in part.chunks():
+                yield chunk
+        else:
+            yield part
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+import httpx
+
+from .body import RawJSON
+from .message import SEND_ACTIONS, Message
+
+logger = logging.getLogger("milkypy")
+
+# 消息场景 -> (发送消息 API, 对端 ID 参数名)
+SEND_APIS = {scene: (action, peer_field) for action, (scene, peer_field) in SEND_ACTIONS.items()}
+
+Target = Tuple[str, int]
+
+class BroadcastResult(NamedTuple):
+    target: Target
+    ok: bool
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[BaseException] = None
+    retryable: bool = False
+
+def is_retryable(error: BaseException) -> bool:
+    """网络错误、超时、限流与服务端错误可以重试；协议端明确返回的失败（如无权限）不重试"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+class Broadcast:
+    """
+    向多个目标发送同一条消息
+
+    消息段列表只编码一次，以 `RawJSON` 拼接进每个请求体。发送在并发数与速率限制下进行，
+    可以用 `async for` 按完成顺序逐个获取结果，也可以直接 `await` 等待全部完成并获取汇总。
+
+    Args:
+        client (MilkyClient): 客户端
+        targets (Iterable[Tuple[str, int] | int]): 目标列表，`("group", 群号)` 或 `("friend", QQ 号)`，
+            整数视为群号
+        message (List[dict] | Message): 消息段列表 (OutgoingSegment[])，也可以是已编码的 `RawJSON`
+        concurrency (int, 可选): 最多同时进行的发送数量。默认为 8。
+        rate (float, 可选): 每秒最多开始的发送数量，为 None 时不限制
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        targets: Iterable[Union[Target, int]],
+        message: Union[List[dict], Message, RawJSON],
+        concurrency: int = 8,
+        rate: Optional[float] = None,
+    ):
+        self.client = client
+        self.targets: List[Target] = [("group", target) if isinstance(target, int) else tuple(target) for target in targets]
+        for scene, _ in self.targets:
+            if scene not in SEND_APIS:
+                raise ValueError(f"Unsupported broadcast scene: {scene}")
+        if isinstance(message, Message):
+            message = RawJSON(message.freeze().encoded)
+        self.message = message if isinstance(message, RawJSON) else RawJSON(message)
+        self.concurrency = concurrency
+        self.rate = rate
+        self.results: List[BroadcastResult] = []
+        self._next_slot = 0.0
+        self._rate_lock = asyncio.Lock()
+        self._iterating = False
+
+    def __await__(self):
+        return self.summary().__await__()
+
+    async def __aiter__(self) -> AsyncIterator[BroadcastResult]:
+        if self._iterating:
+            raise RuntimeError("Broadcast can only be iterated once")
+        self._iterating = True
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send(target: Target) -> BroadcastResult:
+            async with semaphore:
+                await self._wait_rate()
+                return await self._send(target)
+
+        tasks = [asyncio.ensure_future(send(target)) for target in self.targets]
+        try:
+            for future in asyncio.as_completed(tasks):
+                result = await future
+                self.results.append(result)
+                yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def summary(self) -> Dict[str, Any]:
+        """
+        等待全部发送完成
+
+        Returns:
+            Dict: {"total", "sent", "failed", "failures": List[BroadcastResult], "retry_targets": List[Target]}
+        """
+        if not self._iterating:
+            async for _ in self:
+                pass
+        failures = [result for result in self.results if not result.ok]
+        return {
+            "total": len(self.targets),
+            "sent": len(self.results) - len(failures),
+            "failed": len(failures),
+            "failures": failures,
+            "retry_targets": [result.target for result in failures if result.retryable],
+        }
+
+    async def _wait_rate(self):
+        if not self.rate:
+            return
+        async with self._rate_lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + 1 / self.rate
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _send(self, target: Target) -> BroadcastResult:
+        scene, peer_id = target
+        action, peer_field = SEND_APIS[scene]
+        try:
+            result = await self.client.call_api(action, {peer_field: peer_id, "message": self.message})
+        except Exception as e:
+            logger.debug(f"Broadcast to {scene} {peer_id} failed: {e}")
+            self.client.metrics.inc("broadcast_sends", result="failed")
+            return BroadcastResult(target, False, error=e, retryable=is_retryable(e))
+        self.client.metrics.inc("broadcast_sends", result="sent")
+        return BroadcastResult(target, True, result=result)
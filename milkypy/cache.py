@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional
+
+from .columnar import EntityTable, StringPool
+from .roster import GroupRoster
+
+logger = logging.getLogger("milkypy")
+
+class EntityStore:
+    """
+    实体缓存
+
+    保存好友、群与群成员信息，由预热流程填充，并根据收到的事件统计各群的活跃度。
+    所有实体均以列式 `EntityTable` 存储，并共享同一个字符串驻留池。
+
+    Attributes:
+        friends (EntityTable): 以 QQ 号为键的好友信息
+        groups (EntityTable): 以群号为键的群信息
+        members (Dict[int, GroupRoster]): 以群号为键的群成员名册
+        activity (Dict[int, int]): 各群收到的消息数量
+    """
+
+    def __init__(self):
+        self.strings = StringPool()
+        self.friends = EntityTable("user_id", self.strings)
+        self.groups = EntityTable("group_id", self.strings)
+        self.members: Dict[int, GroupRoster] = {}
+        self.activity: Dict[int, int] = {}
+
+    def set_friends(self, friends: Iterable[Mapping[str, Any]]):
+        self.friends = EntityTable.from_rows(friends, "user_id", self.strings)
+
+    def set_groups(self, groups: Iterable[Mapping[str, Any]]):
+        self.groups = EntityTable.from_rows(groups, "group_id", self.strings)
+
+    def set_members(self, group_id: int, members: Iterable[Mapping[str, Any]]) -> GroupRoster:
+        roster = self.members[group_id] = GroupRoster(group_id, members, self.strings)
+        return roster
+
+    def get_friend(self, user_id: int) -> Optional[Mapping[str, Any]]:
+        return self.friends.get(user_id)
+
+    def get_group(self, group_id: int) -> Optional[Mapping[str, Any]]:
+        return self.groups.get(group_id)
+
+    def get_member(self, group_id: int, user_id: int) -> Optional[Mapping[str, Any]]:
+        members = self.members.get(group_id)
+        return members.get(user_id) if members is not None else None
+
+    def observe_message(self, payload: Dict[str, Any], self_id: Any = None):
+        """统计群消息活跃度，供预热时确定加载顺序"""
+        if payload.get("message_scene") == "group":
+            peer_id = payload["peer_id"]
+            self.activity[peer_id] = self.activity.get(peer_id, 0) + 1
+
+    def by_activity(self, group: Mapping[str, Any]):
+        """默认预热顺序：最活跃的群优先，其次是成员较少（加载更快）的群"""
+        return (-self.activity.get(group["group_id"], 0), group.get("member_count", 0))
+
+async def warm_up(
+    client: Any,
+    store: EntityStore,
+    concurrency: int = 8,
+    priority: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    progress: Optional[Callable[[int, int], Any]] = None,
+) -> Dict[str, int]:
+    """
+    预热实体缓存
+
+    并发获取好友列表与群列表，然后按优先级顺序并发获取每个群的成员列表。
+
+    Args:
+        client (MilkyClient): 客户端
+        store (EntityStore): 目标缓存
+        concurrency (int, 可选): 获取群成员列表的最大并发数。默认为 8。
+        priority (Callable, 可选): 群信息到排序键的函数，键越小越先加载。默认为 `store.by_activity`。
+        progress (Callable, 可选): 每加载完一个群后以 `(已完成数, 总数)` 调用
+
+    Returns:
+        friends (int): 好友数量
+        groups (int): 群数量
+        loaded (int): 成功加载成员列表的群数量
+        failed (int): 加载失败的群数量
+    """
+    friends, groups = await asyncio.gather(client.get_friend_list(), client.get_group_list())
+    store.set_friends(friends["friends"])
+    store.set_groups(groups["groups"])
+
+    order: List[Mapping[str, Any]] = sorted(store.groups.values(), key=priority or store.by_activity)
+    pending = iter(order)
+    total = len(order)
+    stats = {"friends": len(store.friends), "groups": total, "loaded": 0, "failed": 0}
+    client.metrics.set("warm_up_groups_total", total)
+
+    async def worker():
+        for group in pending:
+            group_id = group["group_id"]
+            try:
+                result = await client.get_group_member_list(group_id)
+                store.set_members(group_id, result["members"])
+                stats["loaded"] += 1
+            except Exception as e:
+                logger.warning(f"Failed to warm up members of group {group_id}: {e}")
+                stats["failed"] += 1
+            done = stats["loaded"] + stats["failed"]
+            client.metrics.set("warm_up_groups_done", done)
+            if progress is not None:
+                progress(done, total)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, total)))))
+    logger.info(
+        f"Warm-up finished: {stats['friends']} friends, {stats['loaded']}/{total} groups loaded"
+    )
+    return stats
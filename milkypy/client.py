@@ -1,16 +1,41 @@
 import asyncio
 import json
 import logging
-from typing import Any, Callable, Dict, List, Optional, Union
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Coroutine, Dict, Iterable, List, Optional, Set, Tuple, Union
 
 import httpx
 import websockets
 from websockets.exceptions import ConnectionClosed
 
-from .message import Text
+from .batch import EventBatcher
+from .body import encode_body
+from .broadcast import Broadcast
+from .coalesce import OutboundCoalescer
+from .cache import EntityStore, warm_up
+from .columnar import EntityTable
+from .event import MessageEvent
+from .forward import ForwardResolver
+from .idempotency import IdempotentSender
+from .intake import BLOCK, EventQueue
+from .message import Message, Text
+from .media import MediaCache, MediaSource, StreamedFile
+from .metrics import Metrics
+from .recent import RecentMessages
+from .recorder import EventRecorder
+from .resources import ResourceCache
+from .roster import RosterManager
+from .search import SearchIndex
+from .splitting import LongMessageSender
+from .waiters import EventWaiters
+from .store import MessageStore
 
 logger = logging.getLogger("milkypy")
 
+
 class MilkyClient:
     def __init__(
         self,
@@ -19,6 +44,14 @@ class MilkyClient:
         token: Optional[str] = None,
         api_port: Optional[int] = None,
         event_port: Optional[int] = None,
+        record_path: Optional[str] = None,
+        event_queue_size: Optional[int] = None,
+        overflow_policies: Optional[Dict[str, str]] = None,
+        default_overflow_policy: str = BLOCK,
+        event_workers: int = 1,
+        recent_messages: int = 2048,
+        shared_filesystem: bool = False,
+        staging_dir: Optional[str] = None,
     ):
         self.host = host
         self.port = port
@@ -34,6 +67,69 @@ class MilkyClient:
         self.http_url = f"http://{host}:{_api_port}/api"
         self._ws: Optional[Any] = None
         self._handlers: Dict[str, list[Callable]] = {}
+        self._stale_handlers: Dict[str, list[Callable]] = {}
+        self._batchers: Dict[str, list[EventBatcher]] = {}
+        # 内部状态同步使用的观察者，不受过期丢弃影响
+        self._observers: Dict[str, List[Callable]] = {}
+        self._connect_hooks: List[Callable] = []
+        self._disconnect_hooks: List[Callable] = []
+        self._max_event_age: Dict[str, float] = {}
+        # 计算事件延迟使用的时钟，回放时替换为录制时的时间线
+        self._clock: Callable[[], float] = time.time
+        self._recorder: Optional[EventRecorder] = None
+        if record_path:
+            self.start_recording(record_path)
+
+        self.metrics = Metrics()
+        self.entities = EntityStore()
+        self._observe("message_receive", self.entities.observe_message)
+        self.rosters = RosterManager(self, self.entities)
+        self.media = MediaCache(local=shared_filesystem, staging_dir=staging_dir, metrics=self.metrics)
+        # 可在本地应答 API 调用的数据源，按顺序查询，见 enable_message_store
+        self._api_sources: List[Any] = []
+        # 最近消息缓存，recent_messages 为 0 时不启用
+        self.recent_messages: Optional[RecentMessages] = None
+        if recent_messages:
+            self.recent_messages = RecentMessages(recent_messages, self.metrics)
+            self._observe("message_receive", self.recent_messages.observe)
+            self._api_sources.append(self.recent_messages)
+        self.message_store: Optional[MessageStore] = None
+        self.search_index: Optional[SearchIndex] = None
+        self.resources: Optional[ResourceCache] = None
+        self.forwards = ForwardResolver(self)
+        self._coalescer: Optional[OutboundCoalescer] = None
+        self._splitter: Optional[LongMessageSender] = None
+        self.idempotency = IdempotentSender(self)
+        self.waiters = EventWaiters(self)
+        self.self_id: Optional[int] = None
+        # 设置 event_queue_size 后，WebSocket 读取与事件处理通过有界队列解耦
+        self._event_queue: Optional[EventQueue] = None
+        self._event_workers = event_workers
+        self._worker_tasks: List[asyncio.Task] = []
+        if event_queue_size:
+            self._event_queue = EventQueue(
+                event_queue_size,
+                policies=overflow_policies,
+                default_policy=default_overflow_policy,
+                metrics=self.metrics,
+            )
+
+        # 生命周期状态
+        self._running = False
+        self._connect_task: Optional[asyncio.Task] = None
+        self._stop_task: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._http: Optional[httpx.AsyncClient] = None
+        self._pending_calls = 0
+        self._calls_idle = asyncio.Event()
+        self._calls_idle.set()
+
+    async def __aenter__(self) -> "MilkyClient":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
 
     def on(self, event_type: str):
         def decorator(func: Callable):
@@ -43,48 +139,503 @@ class MilkyClient:
             return func
         return decorator
 
+    def on_connect(self, func: Callable) -> Callable:
+        """
+        注册连接建立钩子
+
+        每次 WebSocket 连接（包括重连）建立后以 `hook(client)` 的形式在后台调用，不阻塞事件接收。
+        """
+        self._connect_hooks.append(func)
+        return func
+
+    def on_disconnect(self, func: Callable) -> Callable:
+        """
+        注册连接断开钩子
+
+        每次 WebSocket 连接断开后以 `hook(client)` 的形式调用。
+        """
+        self._disconnect_hooks.append(func)
+        return func
+
+    def on_batch(
+        self,
+        event_type: str,
+        max_size: int = 50,
+        max_wait: float = 1.0,
+        key: Optional[Union[str, Callable[[Dict[str, Any]], Any]]] = None,
+    ):
+        """
+        注册批处理器
+
+        同类事件按 `key` 分组缓冲，达到 `max_size` 条或等待 `max_wait` 秒后整批投递，
+        处理器签名为 `handler(client, events, self_id, key)`。
+
+        Args:
+            event_type (str): 事件类型
+            max_size (int, 可选): 每批最大事件数。默认为 50。
+            max_wait (float, 可选): 每批最长等待时间（秒）。默认为 1.0。
+            key (str | Callable, 可选): 分组键，事件字段名（如 "group_id"）或 `payload -> key` 的函数
+        """
+        def decorator(func: Callable):
+            batcher = EventBatcher(self, func, max_size, max_wait, key)
+            if event_type not in self._batchers:
+                self._batchers[event_type] = []
+            self._batchers[event_type].append(batcher)
+            return func
+        return decorator
+
+    def on_stale(self, event_type: str):
+        """
+        注册过期事件的轻量处理器
+
+        事件超过 `set_max_event_age` 设置的时限后，将改为调用此处注册的处理器，而不是常规处理器。
+        """
+        def decorator(func: Callable):
+            if event_type not in self._stale_handlers:
+                self._stale_handlers[event_type] = []
+            self._stale_handlers[event_type].append(func)
+            return func
+        return decorator
+
+    def set_max_event_age(self, event_type: str, max_age: Optional[float]):
+        """
+        设置事件的最大处理时限
+
+        根据事件自带的 `time` 与当前时间计算延迟，超过时限的事件会被跳过；
+        若该事件类型通过 `on_stale` 注册了轻量处理器，则降级交由其处理。
+
+        Args:
+            event_type (str): 事件类型，`"*"` 表示所有未单独设置的事件类型
+            max_age (float): 最大时限（秒），为 None 时取消限制
+        """
+        if max_age is None:
+            self._max_event_age.pop(event_type, None)
+        else:
+            self._max_event_age[event_type] = max_age
+
+    def _observe(self, event_type: str, func: Callable):
+        if event_type not in self._observers:
+            self._observers[event_type] = []
+        self._observers[event_type].append(func)
+
+    async def wait_for(
+        self,
+        event_type: str,
+        peer_id: Optional[int] = None,
+        sender_id: Optional[int] = None,
+        check: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        等待下一个符合条件的事件
+
+        适用于交互式会话，例如提问后等待同一用户在同一群内的回答。等待者按事件类型、对端与发送者建立索引，
+        大量并发的会话不会拖慢事件分发。注册的处理器仍会照常收到该事件。
+
+        处理器返回之前后续事件不会被分发，因此不要在事件处理器中直接等待，应在后台任务中进行会话。
+
+        Args:
+            event_type: 事件类型，如 "message_receive"
+            peer_id: 对端 ID（群号或好友 QQ 号），为 None 时不限
+            sender_id: 发送者 QQ 号，为 None 时不限
+            check: 额外的过滤条件，接收事件负载并返回是否接受
+            timeout: 最长等待时间（秒），为 None 时一直等待
+
+        Returns:
+            Dict: 事件负载，消息事件为 `MessageEvent`
+
+        Raises:
+            asyncio.TimeoutError: 超时
+        """
+        return await self.waiters.wait(event_type, peer_id, sender_id, check, timeout)
+
+    async def warm_up(
+        self,
+        concurrency: int = 8,
+        priority: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        progress: Optional[Callable[[int, int], Any]] = None,
+    ) -> Dict[str, int]:
+        """
+        预热实体缓存 `entities`
+
+        并发获取好友列表、群列表以及每个群的成员列表，参数含义见 `milkypy.cache.warm_up`。
+        """
+        return await warm_up(self, self.entities, concurrency, priority, progress)
+
+    def enable_warm_up(
+        self,
+        concurrency: int = 8,
+        priority: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        progress: Optional[Callable[[int, int], Any]] = None,
+    ):
+        """在每次连接建立后于后台预热实体缓存，预热期间正常处理事件"""
+        async def hook(client: "MilkyClient"):
+            await client.warm_up(concurrency, priority, progress)
+        self.on_connect(hook)
+
+    async def media_uri(self, source: MediaSource) -> Union[str, StreamedFile]:
+        """
+        将本地文件路径或字节内容转换为可用于 `Image` `Record` `Video` 与文件上传的 URI
+
+        共享文件系统时使用 `file://` URI，否则编码为 `base64://` URI 并按内容哈希缓存，
+        详见 `milkypy.media.MediaCache`。API 参数中也可以直接使用 `pathlib.Path` 与 `bytes`，发送时自动转换。
+        """
+        return await self.media.uri(source)
+
+    def broadcast(
+        self,
+        targets: Iterable[Union[Tuple[str, int], int]],
+        message: Union[List[dict], Message],
+        concurrency: int = 8,
+        rate: Optional[float] = None,
+    ) -> Broadcast:
+        """
+        向多个群或好友发送同一条消息
+
+        消息只编码一次。返回的 `Broadcast` 可以用 `async for` 按完成顺序获取每个目标的结果，
+        也可以直接 `await` 获取汇总，其中 `retry_targets` 为可以重试的失败目标。
+
+        Args:
+            targets: 目标列表，`("group", 群号)` 或 `("friend", QQ 号)`，整数视为群号
+            message: 消息段列表或 `Message`
+            concurrency: 最多同时进行的发送数量。默认为 8。
+            rate: 每秒最多开始的发送数量，为 None 时不限制
+        """
+        return Broadcast(self, targets, message, concurrency, rate)
+
+    def enable_coalescing(
+        self,
+        window: float = 0.3,
+        separator: Optional[List[dict]] = None,
+        max_segments: int = 50,
+        max_text_length: int = 3000,
+    ) -> OutboundCoalescer:
+        """
+        启用发送合并
+
+        `window` 秒内发往同一个群或好友的多条消息合并为一条发送，每个调用者得到合并后消息的发送结果。
+        参数含义见 `milkypy.coalesce.OutboundCoalescer`。节省的 API 调用次数以 `coalesce_calls_saved` 计数。
+        """
+        self._coalescer = OutboundCoalescer(self, window, separator, max_segments, max_text_length)
+        return self._coalescer
+
+    def enable_auto_split(
+        self,
+        max_length: int = 3000,
+        max_segments: int = 50,
+        forward_threshold: Optional[int] = None,
+    ) -> LongMessageSender:
+        """
+        启用长消息自动拆分
+
+        发送的消息超过长度限制时拆分为多条依次发送，或在拆分结果超过 `forward_threshold` 条时打包为合并转发。
+        拆分发送的结果中 `message_seqs` 包含全部消息的序列号，参数含义见 `milkypy.splitting.LongMessageSender`。
+        """
+        self._splitter = LongMessageSender(self, max_length, max_segments, forward_threshold)
+        return self._splitter
+
+    def enable_resource_cache(
+        self,
+        directory: str,
+        max_bytes: int = 512 * 1024 * 1024,
+        concurrency: int = 8,
+    ) -> ResourceCache:
+        """
+        配置资源下载缓存
+
+        参数含义见 `milkypy.resources.ResourceCache`。未调用时，`fetch_resource` 使用系统临时目录下的默认缓存。
+        """
+        if self.resources is not None:
+            self.resources.close()
+        self.resources = ResourceCache(self, directory, max_bytes, concurrency, self.metrics)
+        return self.resources
+
+    async def fetch_resource(self, resource_id: str) -> Path:
+        """
+        下载资源（如图片消息段的 resource_id）到本地缓存并返回文件路径
+
+        同一资源只下载一次，并发请求共享同一次下载。需要逐块读取内容时可以使用
+        `client.resources.iter_bytes(resource_id)`。
+        """
+        if self.resources is None:
+            self.enable_resource_cache(os.path.join(tempfile.gettempdir(), "milkypy-resources"))
+        return await self.resources.fetch(resource_id)
+
+    def enable_message_store(
+        self,
+        path: str,
+        max_age: Optional[float] = None,
+        max_messages: Optional[int] = None,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+    ) -> MessageStore:
+        """
+        启用本地消息存储
+
+        收到的消息与可还原的自身发送消息写入本地 SQLite 数据库，`get_message` 以及范围已知的
+        `get_history_messages` 调用将直接在本地应答，参数含义见 `milkypy.store.MessageStore`。
+
+        Returns:
+            MessageStore: 消息存储，也可通过 `client.message_store` 访问
+        """
+        if self.message_store is not None:
+            return self.message_store
+        store = MessageStore(path, max_age, max_messages, batch_size, flush_interval)
+        self.message_store = store
+        self._observe("message_receive", store.observe)
+        self._api_sources.append(store)
+        self.on_disconnect(lambda client: store.break_continuity())
+        return store
+
+    def enable_search_index(self, path: str, max_age: Optional[float] = None) -> SearchIndex:
+        """
+        启用消息全文索引
+
+        收到消息的文本在后台线程中写入 SQLite FTS5 索引，可通过 `client.search_index.search` 查询，
+        参数含义见 `milkypy.search.SearchIndex`。
+        """
+        if self.search_index is None:
+            self.search_index = SearchIndex(path, max_age)
+            self._observe("message_receive", self.search_index.observe)
+        return self.search_index
+
+    def start_recording(self, path: str):
+        """
+        开始录制收到的原始事件帧
+
+        Args:
+            path (str): gzip 压缩的录制日志路径，可用 `milkypy.recorder.replay` 回放
+        """
+        self.stop_recording()
+        self._recorder = EventRecorder(path)
+
+    def stop_recording(self):
+        """停止录制并关闭日志文件"""
+        if self._recorder is not None:
+            self._recorder.close()
+            self._recorder = None
+
     async def connect(self):
         headers = {}
         if self.token:
             headers["Authorization"] = f"Bearer {self.token}"
 
-        while True:
+        self._running = True
+        while self._running:
             try:
                 async with websockets.connect(self.ws_url, additional_headers=headers) as websocket:
                     self._ws = websocket
-                    async for message in websocket:
-                        await self._handle_message(message)
+                    self._spawn(self._run_hooks(self._connect_hooks))
+                    try:
+                        async for message in websocket:
+                            if self._recorder is not None:
+                                self._recorder.record(message, time.time())
+                            await self._handle_message(message)
+                    finally:
+                        self._ws = None
+                        await self._run_hooks(self._disconnect_hooks)
             except ConnectionClosed:
+                if not self._running:
+                    break
                 logger.warning("WebSocket connection closed, reconnecting...")
                 await asyncio.sleep(1)
             except Exception as e:
+                if not self._running:
+                    break
                 logger.error(f"Error in WebSocket loop: {e}")
                 await asyncio.sleep(1)
 
+    async def start(self):
+        """在后台启动客户端，立即返回"""
+        if self._connect_task is None or self._connect_task.done():
+            self._running = True
+            self._connect_task = asyncio.create_task(self.connect())
+
+    async def stop(self, timeout: float = 10.0):
+        """
+        停止客户端
+
+        依次停止接收事件、等待已接收的事件与批次处理完毕、等待进行中的 API 调用返回，
+        最后关闭连接池。超过 `timeout` 秒仍未完成的任务将被取消。
+
+        在事件处理器内调用时，停止流程会在后台进行，本方法立即返回。
+
+        Args:
+            timeout (float, 可选): 等待排空的最长时间（秒）。默认为 10.0。
+        """
+        current = asyncio.current_task()
+        if current is self._connect_task or current in self._worker_tasks or current in self._tasks:
+            if self._stop_task is None or self._stop_task.done():
+                self._stop_task = asyncio.create_task(self.stop(timeout))
+            return
+
+        self._running = False
+        if self._ws is not None:
+            await self._ws.close()
+        # 不会再有事件到达，等待中的会话无法完成
+        self.waiters.close()
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Timed out while draining, cancelling remaining tasks")
+
+        tasks = [task for task in (self._connect_task, *self._worker_tasks, *self._tasks) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._connect_task = None
+        self._worker_tasks = []
+        self._tasks.clear()
+
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        if self._recorder is not None:
+            self._recorder.flush()
+        self.media.close()
+        if self.resources is not None:
+            self.resources.close()
+        if self.message_store is not None:
+            await self.message_store.flush()
+        if self.search_index is not None:
+            await self.search_index.flush()
+
+    async def _drain(self):
+        if self._connect_task is not None:
+            await asyncio.wait({self._connect_task})
+        if self._event_queue is not None and self._worker_tasks:
+            await self._event_queue.join()
+        for batchers in self._batchers.values():
+            for batcher in batchers:
+                await batcher.drain()
+        if self._coalescer is not None:
+            await self._coalescer.flush_all()
+        while self._tasks:
+            await asyncio.wait(set(self._tasks))
+        await self._calls_idle.wait()
+
+    def _spawn(self, coro: Coroutine) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run_hooks(self, hooks: List[Callable]):
+        for hook in hooks:
+            try:
+                if asyncio.iscoroutinefunction(hook):
+                    await hook(self)
+                else:
+                    hook(self)
+            except Exception as e:
+                logger.error(f"Failed to run lifecycle hook: {e}")
+
     async def _handle_message(self, message: Union[str, bytes]):
         try:
             data = json.loads(message)
             event_type = data["event_type"]
-            
-            if event_type in self._handlers:
+        except (KeyError, TypeError, json.JSONDecodeError):
+            logger.warning(f"Invalid message format: {message}")
+            return
+
+        if self._event_queue is None:
+            await self._dispatch(data)
+            return
+
+        self._ensure_workers()
+        if not await self._event_queue.put(event_type, data):
+            logger.debug(f"Event queue full, dropped {event_type} event")
+
+    async def _dispatch(self, data: Dict[str, Any]):
+        try:
+            event_type = data["event_type"]
+            self_id = data.get("self_id")
+            event_time = data.get("time")
+            if self_id is not None:
+                self.self_id = self_id
+            if event_type == "message_receive":
+                # 派生视图（纯文本、提及等）在处理器之间共享，详见 milkypy.event.MessageEvent
+                data["data"] = MessageEvent(data["data"], self.self_id)
+
+            for observer in self._observers.get(event_type, ()):
+                observer(data["data"], self_id)
+
+            handlers = self._handlers.get(event_type)
+            batchers = self._batchers.get(event_type)
+            if event_time is not None:
+                lag = self._clock() - event_time
+                self.metrics.set("event_lag_seconds", lag, event_type=event_type)
+                max_age = self._max_event_age.get(event_type, self._max_event_age.get("*"))
+                if max_age is not None and lag > max_age:
+                    handlers = self._stale_handlers.get(event_type)
+                    batchers = None
+                    action = "downgrade" if handlers else "skip"
+                    self.metrics.inc("events_stale", event_type=event_type, action=action)
+
+            if handlers or batchers:
                 # Milky 协议事件中 'data' 字段包含实际负载
                 payload = data["data"]
-                self_id = data.get("self_id")
-                time = data.get("time")
-                
-                for handler in self._handlers[event_type]:
+
+                for batcher in batchers or ():
+                    batcher.add(payload, self_id)
+
+                for handler in handlers or ():
                     if asyncio.iscoroutinefunction(handler):
-                        await handler(self, payload, self_id, time)
+                        await handler(self, payload, self_id, event_time)
                     else:
-                        handler(self, payload, self_id, time)
-        except (KeyError, json.JSONDecodeError):
-            logger.warning(f"Invalid message format: {message}")
+                        handler(self, payload, self_id, event_time)
+        except KeyError:
+            logger.warning(f"Invalid message format: {data}")
         except Exception as e:
             logger.error(f"Failed to handle message: {e}")
 
-    async def call_api(self, action: str, params: Optional[Dict[str, Any]] = None) -> Any:
+    def _ensure_workers(self):
+        self._worker_tasks = [task for task in self._worker_tasks if not task.done()]
+        while len(self._worker_tasks) < self._event_workers:
+            self._worker_tasks.append(asyncio.create_task(self._event_worker()))
+
+    async def _event_worker(self):
+        while True:
+            data = await self._event_queue.get()
+            try:
+                await self._dispatch(data)
+            finally:
+                self._event_queue.task_done()
+
+    async def call_api(
+        self,
+        action: str,
+        params: Optional[Dict[str, Any]] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> Any:
+        params = params or {}
+        coalescer = self._coalescer
+        if idempotency_key is not None:
+            # 带有幂等键的调用不参与发送合并，详见 milkypy.idempotency.IdempotentSender
+            send = lambda: self.idempotency.send(action, params, idempotency_key)
+        elif coalescer is not None and coalescer.accepts(action, params):
+            return await coalescer.submit(action, params)
+        else:
+            send = lambda: self._call_api(action, params)
+        if coalescer is not None:
+            # 不能合并的发送排在同一对端已排队的消息之后
+            return await coalescer.run_in_order(action, params, send)
+        return await send()
+
+    async def _call_api(self, action: str, params: Dict[str, Any]) -> Any:
+        if self._splitter is not None and self._splitter.accepts(action, params):
+            return await self._splitter.send(action, params)
+        for source in self._api_sources:
+            result = await source.lookup(action, params)
+            if result is not None:
+                self.metrics.inc("api_local_hits", action=action)
+                return result
+
         # Milky protocol primarily uses HTTP for API calls
-        return await self.call_api_http(action, params)
+        result = await self.call_api_http(action, params)
+        for source in self._api_sources:
+            source.observe_result(action, params, result, self.self_id)
+        return result
 
     async def call_api_http(self, action: str, params: Optional[Dict[str, Any]] = None) -> Any:
         headers = {}
@@ -94,10 +645,20 @@ class MilkyClient:
         # Milky API endpoint is /api/:api
         url = f"{self.http_url}/{action}"
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
+        # 自行编码请求体：参数中的 Path / bytes 转换为 URI，StreamedFile 在发送时流式编码
+        body, length = await encode_body(params or {}, self.media.uri)
+        headers["Content-Type"] = "application/json"
+        if length is not None:
+            headers["Content-Length"] = str(length)
+        self.metrics.inc("api_requests", action=action)
+        self.metrics.inc("api_request_bytes", length if length is not None else len(body), action=action)
+
+        self._pending_calls += 1
+        self._calls_idle.clear()
+        try:
+            response = await self._get_http().post(
                 url,
-                json=params or {},
+                content=body,
                 headers=headers
             )
             response.raise_for_status()
@@ -105,6 +666,16 @@ class MilkyClient:
             if data["status"] == "failed" or data.get("retcode", 0) != 0:
                 raise RuntimeError(f"API call failed (retcode {data.get('retcode')}): {data.get('message', 'Unknown error')}")
             return data["data"]
+        finally:
+            self._pending_calls -= 1
+            if self._pending_calls == 0:
+                self._calls_idle.set()
+
+    def _get_http(self) -> httpx.AsyncClient:
+        # 所有 API 调用共享同一个连接池，在 stop() 时关闭
+        if self._http is None:
+            self._http = httpx.AsyncClient()
+        return self._http
 
     async def run(self):
         """运行客户端"""
@@ -156,17 +727,21 @@ class MilkyClient:
         """
         return await self.call_api("get_user_profile", {"user_id": user_id})
 
-    async def get_friend_list(self, no_cache: bool = False) -> Dict[str, Any]:
+    async def get_friend_list(self, no_cache: bool = False, compact: bool = False) -> Dict[str, Any]:
         """
         获取好友列表
         
         Args:
             no_cache: 是否强制不使用缓存
+            compact: 是否将列表转换为紧凑的列式表 (EntityTable) 返回
         
         Returns:
             friends (List[FriendEntity]): 好友列表
         """
-        return await self.call_api("get_friend_list", {"no_cache": no_cache})
+        data = await self.call_api("get_friend_list", {"no_cache": no_cache})
+        if compact:
+            data["friends"] = EntityTable.from_rows(data["friends"], "user_id")
+        return data
 
     async def get_friend_info(self, user_id: int, no_cache: bool = False) -> Dict[str, Any]:
         """
@@ -184,17 +759,21 @@ class MilkyClient:
             "no_cache": no_cache,
         })
 
-    async def get_group_list(self, no_cache: bool = False) -> Dict[str, Any]:
+    async def get_group_list(self, no_cache: bool = False, compact: bool = False) -> Dict[str, Any]:
         """
         获取群列表
         
         Args:
             no_cache: 是否强制不使用缓存
+            compact: 是否将列表转换为紧凑的列式表 (EntityTable) 返回
         
         Returns:
             groups (List[GroupEntity]): 群列表
         """
-        return await self.call_api("get_group_list", {"no_cache": no_cache})
+        data = await self.call_api("get_group_list", {"no_cache": no_cache})
+        if compact:
+            data["groups"] = EntityTable.from_rows(data["groups"], "group_id")
+        return data
 
     async def get_group_info(self, group_id: int, no_cache: bool = False) -> Dict[str, Any]:
         """
@@ -212,21 +791,25 @@ class MilkyClient:
             "no_cache": no_cache,
         })
 
-    async def get_group_member_list(self, group_id: int, no_cache: bool = False) -> Dict[str, Any]:
+    async def get_group_member_list(self, group_id: int, no_cache: bool = False, compact: bool = False) -> Dict[str, Any]:
         """
         获取群成员列表
         
         Args:
             group_id: 群号
             no_cache: 是否强制不使用缓存
+            compact: 是否将列表转换为紧凑的列式表 (EntityTable) 返回
         
         Returns:
             members (List[GroupMemberEntity]): 群成员列表
         """
-        return await self.call_api("get_group_member_list", {
+        data = await self.call_api("get_group_member_list", {
             "group_id": group_id,
             "no_cache": no_cache,
         })
+        if compact:
+            data["members"] = EntityTable.from_rows(data["members"], "user_id")
+        return data
 
     async def get_group_member_info(self, group_id: int, user_id: int, no_cache: bool = False) -> Dict[str, Any]:
         """
@@ -267,13 +850,14 @@ class MilkyClient:
         """
         return await self.call_api("get_csrf_token", {})
 
-    async def send_private_message(self, user_id: int, message: Union[str, List[dict]]) -> Dict[str, Any]:
+    async def send_private_message(self, user_id: int, message: Union[str, List[dict]], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         """
         发送私聊消息
         
         Args:
             user_id: 好友 QQ 号
             message: 消息内容
+            idempotency_key: 幂等键，同一个键的重复调用只会发送一次消息
         
         Returns:
             message_seq (int): 消息序列号
@@ -284,15 +868,16 @@ class MilkyClient:
         return await self.call_api("send_private_message", {
             "user_id": user_id,
             "message": message,
-        })
+        }, idempotency_key=idempotency_key)
 
-    async def send_group_message(self, group_id: int, message: Union[str, List[dict]]) -> Dict[str, Any]:
+    async def send_group_message(self, group_id: int, message: Union[str, List[dict]], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         """
         发送群聊消息
         
         Args:
             group_id: 群号
             message: 消息内容
+            idempotency_key: 幂等键，同一个键的重复调用只会发送一次消息
         
         Returns:
             message_seq (int): 消息序列号
@@ -303,7 +888,7 @@ class MilkyClient:
         return await self.call_api("send_group_message", {
             "group_id": group_id,
             "message": message,
-        })
+        }, idempotency_key=idempotency_key)
 
     async def recall_private_message(self, user_id: int, message_seq: int) -> Dict[str, Any]:
         """
@@ -0,0 +1,160 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .message import SEND_ACTIONS, Message, to_dicts
+
+# 可以与其他消息合并的消息段类型；回复只能位于合并后消息的开头
+MERGEABLE_SEGMENTS = ("text", "mention", "mention_all", "face", "image", "reply")
+
+_Key = Tuple[str, int]
+
+class _Batch:
+    __slots__ = ("segments", "futures", "text_length", "handle")
+
+    def __init__(self):
+        self.segments: List[Dict[str, Any]] = []
+        self.futures: List[asyncio.Future] = []
+        self.text_length = 0
+        self.handle: Optional[asyncio.TimerHandle] = None
+
+class OutboundCoalescer:
+    """
+    发送合并器
+
+    在 `window` 秒内发往同一个群或好友的多条消息合并为一条发送，消息之间插入 `separator`，
+    相邻的文本消息段合并为一个。每个调用者仍然得到自己的结果（即合并后消息的发送结果）。
+
+    包含语音、视频、文件、合并转发等无法合并的消息段的消息会先发送之前排队的消息再单独发送，
+    以保持顺序；带有回复的消息总是作为新合并消息的开头。
+
+    Args:
+        client (MilkyClient): 客户端
+        window (float, 可选): 合并窗口（秒），从第一条消息入队时开始计时。默认为 0.3。
+        separator (List[dict], 可选): 插入到消息之间的消息段。默认为换行文本。
+        max_segments (int, 可选): 合并后消息最多包含的消息段数量。默认为 50。
+        max_text_length (int, 可选): 合并后消息最多包含的文本长度。默认为 3000。
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        window: float = 0.3,
+        separator: Optional[List[Dict[str, Any]]] = None,
+        max_segments: int = 50,
+        max_text_length: int = 3000,
+    ):
+        self.client = client
+        self.window = window
+        self.separator = separator if separator is not None else [{"type": "text", "data": {"text": "\n"}}]
+        self.max_segments = max_segments
+        self.max_text_length = max_text_length
+        self._batches: Dict[_Key, _Batch] = {}
+        # 每个对端最后一个发送任务，后续发送在其完成后进行
+        self._tails: Dict[_Key, asyncio.Task] = {}
+
+    def accepts(self, action: str, params: Dict[str, Any]) -> bool:
+        """是否为可以合并的发送调用：只包含对端 ID 与消息段列表（或 `Message`）"""
+        if action not in SEND_ACTIONS:
+            return False
+        return params.keys() == {SEND_ACTIONS[action][1], "message"} \
+            and isinstance(params["message"], (list, Message))
+
+    async def submit(self, action: str, params: Dict[str, Any]) -> Any:
+        key = (action, params[SEND_ACTIONS[action][1]])
+        segments = to_dicts(params["message"])
+        if not all(isinstance(segment, dict) and segment.get("type") in MERGEABLE_SEGMENTS for segment in segments):
+            # 无法合并：在已排队的消息之后单独发送
+            return await self.run_in_order(action, params, lambda: self.client._call_api(action, params))
+
+        batch = self._batches.get(key)
+        text_length = sum(len(segment["data"].get("text", "")) for segment in segments if segment["type"] == "text")
+        has_reply = any(segment["type"] == "reply" for segment in segments)
+        if batch is not None and (
+            has_reply
+            or len(batch.segments) + len(self.separator) + len(segments) > self.max_segments
+            or batch.text_length + text_length > self.max_text_length
+        ):
+            self._dispatch(key)
+            batch = None
+        if batch is None:
+            batch = self._batches[key] = _Batch()
+            batch.handle = asyncio.get_running_loop().call_later(self.window, self._dispatch, key)
+        elif segments:
+            _extend(batch.segments, self.separator)
+        _extend(batch.segments, segments)
+        batch.text_length += text_length
+        future = asyncio.get_running_loop().create_future()
+        batch.futures.append(future)
+        return await future
+
+    async def run_in_order(self, action: str, params: Dict[str, Any], send: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        在同一对端已排队的消息之后执行不能合并的发送
+
+        发送前先发出该对端正在合并的消息，之后的发送也会等待这次发送完成，保持发送顺序。
+        非发送消息的调用直接执行。
+        """
+        _, peer_field = SEND_ACTIONS.get(action, (None, None))
+        if peer_field not in params:
+            return await send()
+        key = (action, params[peer_field])
+        self._dispatch(key)
+        return await self._enqueue(key, send)
+
+    async def flush(self, key: _Key):
+        """立即发送某个对端排队中的消息"""
+        task = self._dispatch(key)
+        if task is not None:
+            await task
+
+    async def flush_all(self):
+        await asyncio.gather(*(self.flush(key) for key in list(self._batches)))
+
+    def pending(self) -> int:
+        """排队中的消息数量"""
+        return sum(len(batch.futures) for batch in self._batches.values())
+
+    def _dispatch(self, key: _Key) -> Optional[asyncio.Task]:
+        batch = self._batches.pop(key, None)
+        if batch is None:
+            return None
+        if batch.handle is not None:
+            batch.handle.cancel()
+        return self._enqueue(key, lambda: self._send(key, batch))
+
+    async def _send(self, key: _Key, batch: _Batch):
+        action, peer_id = key
+        try:
+            result = await self.client._call_api(action, {SEND_ACTIONS[action][1]: peer_id, "message": batch.segments})
+        except Exception as e:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        if len(batch.futures) > 1:
+            self.client.metrics.inc("coalesce_calls_saved", len(batch.futures) - 1)
+        for future in batch.futures:
+            if not future.done():
+                future.set_result(result)
+
+    def _enqueue(self, key: _Key, send: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        # 同一对端的发送按入队顺序依次进行
+        previous = self._tails.get(key)
+
+        async def run():
+            if previous is not None:
+                await asyncio.wait({previous})
+            return await send()
+
+        task = self.client._spawn(run())
+        self._tails[key] = task
+        task.add_done_callback(lambda _: self._tails.pop(key) if self._tails.get(key) is task else None)
+        return task
+
+def _extend(target: List[Dict[str, Any]], segments: List[Dict[str, Any]]):
+    # 合并相邻的文本消息段
+    for segment in segments:
+        if target and segment.get("type") == "text" and target[-1].get("type") == "text":
+            target[-1] = {"type": "text", "data": {"text": target[-1]["data"]["text"] + segment["data"]["text"]}}
+        else:
+            target.append(segment)
@@ -0,0 +1,354 @@
+import sys
+from array import array
+from collections.abc import Mapping, MutableMapping
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional
+
+_ABSENT = object()
+
+class StringPool:
+    """
+    字符串驻留池
+
+    相同的字符串只保存一份，列中只存放 4 字节的编号。多个 `EntityTable` 可以共享同一个池，
+    例如同一用户在多个群中的昵称。池中的字符串不会随行删除而释放。
+    """
+
+    __slots__ = ("_strings", "_codes")
+
+    def __init__(self):
+        self._strings: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._strings)
+            value = sys.intern(value)
+            self._strings.append(value)
+            self._codes[value] = code
+        return code
+
+    def __getitem__(self, code: int) -> str:
+        return self._strings[code]
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+class _Column:
+    """
+    单列存储
+
+    - `int`: `array('i')`，溢出时依次升级为 `array('q')` 与普通列表
+    - `bool`: `array('b')`
+    - `str`: 字符串池编号，`array('I')`
+    - `object`: 普通列表，用于无法归入以上类型的值
+
+    缺失值以 `absent` 位图标记，仅在首次出现缺失值时分配。
+    """
+
+    __slots__ = ("kind", "data", "absent", "pool")
+
+    def __init__(self, kind: str, pool: StringPool, length: int = 0):
+        self.kind = kind
+        self.pool = pool
+        if kind == "int":
+            self.data = array("i", bytes(4 * length))
+        elif kind == "bool":
+            self.data = array("b", bytes(length))
+        elif kind == "str":
+            self.data = array("I", bytes(4 * length))
+        else:
+            self.data = [_ABSENT] * length
+        self.absent: Optional[bytearray] = None
+        if length and kind != "object":
+            self.absent = bytearray(b"\x01" * length)
+
+    @staticmethod
+    def kind_of(value: Any) -> str:
+        if isinstance(value, bool):
+            return "bool"
+        if isinstance(value, int):
+            return "int"
+        if isinstance(value, str):
+            return "str"
+        return "object"
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def append(self, value: Any):
+        if value is _ABSENT:
+            if self.kind == "object":
+                self.data.append(_ABSENT)
+                return
+            self._mark_absent(len(self.data), True)
+            self.data.append(0)
+            return
+        self._accept(value)
+        self.data.append(self._encode(value))
+        if self.absent is not None:
+            self.absent.append(0)
+
+    def get(self, index: int) -> Any:
+        if self.absent is not None and self.absent[index]:
+            return _ABSENT
+        value = self.data[index]
+        if self.kind == "str":
+            return self.pool[value]
+        if self.kind == "bool":
+            return bool(value)
+        return value
+
+    def set(self, index: int, value: Any):
+        if value is _ABSENT:
+            if self.kind == "object":
+                self.data[index] = _ABSENT
+            else:
+                self._mark_absent(index, True)
+            return
+        self._accept(value)
+        self.data[index] = self._encode(value)
+        if self.absent is not None:
+            self.absent[index] = 0
+
+    def swap_remove(self, index: int):
+        """以最后一行覆盖被删除的行"""
+        last = len(self.data) - 1
+        if index != last:
+            self.data[index] = self.data[last]
+            if self.absent is not None:
+                self.absent[index] = self.absent[last]
+        self.data.pop()
+        if self.absent is not None:
+            self.absent.pop()
+
+    def nbytes(self) -> int:
+        size = sys.getsizeof(self.data)
+        if self.absent is not None:
+            size += sys.getsizeof(self.absent)
+        return size
+
+    def _mark_absent(self, index: int, flag: bool):
+        if self.absent is None:
+            self.absent = bytearray(len(self.data))
+        if index == len(self.absent):
+            self.absent.append(flag)
+        else:
+            self.absent[index] = flag
+
+    def _encode(self, value: Any) -> Any:
+        if self.kind == "str":
+            return self.pool.code(value)
+        if self.kind == "bool":
+            return int(value)
+        return value
+
+    def _accept(self, value: Any):
+        # 根据新值调整列类型：int 列按需扩宽，类型不一致时退化为普通列表
+        kind = self.kind_of(value)
+        if kind == self.kind:
+            if kind == "int" and isinstance(self.data, array):
+                if self.data.typecode == "i" and not -2**31 <= value < 2**31:
+                    self.data = array("q", self.data) if -2**63 <= value < 2**63 else list(self.data)
+                elif self.data.typecode == "q" and not -2**63 <= value < 2**63:
+                    self.data = list(self.data)
+            return
+        if self.kind != "object":
+            values = [self.get(i) for i in range(len(self.data))]
+            self.kind = "object"
+            self.data = values
+            self.absent = None
+
+class Row(Mapping):
+    """
+    行视图
+
+    按需从列中读取字段，支持 `dict` 的只读接口以及字段赋值。视图通过主键定位行，
+    删除其他行不会使其失效；对应行被删除后访问将抛出 KeyError。
+    """
+
+    __slots__ = ("_table", "_key")
+
+    def __init__(self, table: "EntityTable", key: Hashable):
+        self._table = table
+        self._key = key
+
+    def __getitem__(self, field: str) -> Any:
+        value = self._table._get_field(self._key, field)
+        if value is _ABSENT:
+            raise KeyError(field)
+        return value
+
+    def __setitem__(self, field: str, value: Any):
+        self._table._set_field(self._key, field, value)
+
+    def __iter__(self) -> Iterator[str]:
+        table = self._table
+        index = table._index[self._key]
+        for field, names in table._fields.items():
+            if any(table._columns[name].get(index) is not _ABSENT for name in names):
+                yield field
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: self[field] for field in self}
+
+    def __repr__(self) -> str:
+        return f"Row({self.to_dict()!r})"
+
+class EntityTable(MutableMapping):
+    """
+    列式实体表
+
+    以主键字段为键保存一组同构实体（如 `FriendEntity`、`GroupEntity`、`GroupMemberEntity`），
+    每个字段一列：整数与布尔值使用 `array` 紧凑存储，字符串经 `StringPool` 驻留后只存编号，
+    一层嵌套的字典（如好友的 `category`）展开为 `category.category_id` 形式的子列；
+    展开后该字段为空字典或 None 的行视为缺少该字段。
+
+    表本身是主键到 `Row` 视图的映射，可以像 `dict` 一样使用：`table[user_id]`、`in`、`len`、
+    `values()` 等；赋值 `table[key] = entity` 会插入或替换整行。
+
+    Args:
+        key (str): 主键字段名，如 "user_id"
+        pool (StringPool, 可选): 字符串驻留池，默认为新建的池
+    """
+
+    def __init__(self, key: str, pool: Optional[StringPool] = None):
+        self.key = key
+        self.pool = pool if pool is not None else StringPool()
+        self._columns: Dict[str, _Column] = {}
+        # 顶层字段名 -> 列名列表（嵌套字典展开为多列）
+        self._fields: Dict[str, List[str]] = {}
+        self._index: Dict[Hashable, int] = {}
+        self._keys: List[Hashable] = []
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[Dict[str, Any]],
+        key: str,
+        pool: Optional[StringPool] = None,
+    ) -> "EntityTable":
+        table = cls(key, pool)
+        for row in rows:
+            table[row[key]] = row
+        return table
+
+    def __getitem__(self, key: Hashable) -> Row:
+        if key not in self._index:
+            raise KeyError(key)
+        return Row(self, key)
+
+    def __setitem__(self, key: Hashable, row: Dict[str, Any]):
+        if key in self._index:
+            del self[key]
+        index = len(self._keys)
+        flat = self._flatten(row)
+        for name in flat:
+            if name not in self._columns:
+                self._add_column(name, flat[name])
+        for name, column in self._columns.items():
+            column.append(flat.get(name, _ABSENT))
+        self._index[key] = index
+        self._keys.append(key)
+
+    def __delitem__(self, key: Hashable):
+        index = self._index.pop(key)
+        last = len(self._keys) - 1
+        for column in self._columns.values():
+            column.swap_remove(index)
+        moved = self._keys.pop()
+        if index != last:
+            self._keys[index] = moved
+            self._index[moved] = index
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._keys))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._index
+
+    def pop(self, key: Hashable, default: Any = _ABSENT) -> Any:
+        """删除一行并以 `dict` 形式返回"""
+        if key not in self._index:
+            if default is _ABSENT:
+                raise KeyError(key)
+            return default
+        row = Row(self, key).to_dict()
+        del self[key]
+        return row
+
+    def column(self, field: str) -> List[Any]:
+        """按行顺序读取一列的全部值，缺失值为 None"""
+        column = self._columns.get(field)
+        if column is None:
+            return [None] * len(self)
+        return [None if value is _ABSENT else value for value in (column.get(i) for i in range(len(column)))]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """转换回 `dict` 列表"""
+        return [Row(self, key).to_dict() for key in self._keys]
+
+    def nbytes(self) -> int:
+        """列数据占用的近似字节数（不含共享的字符串池）"""
+        return sum(column.nbytes() for column in self._columns.values()) + sys.getsizeof(self._keys)
+
+    def __repr__(self) -> str:
+        return f"EntityTable(key={self.key!r}, rows={len(self)}, fields={list(self._fields)})"
+
+    def _flatten(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        flat = {}
+        for field, value in row.items():
+            names = self._fields.get(field)
+            if names is not None and names != [field]:
+                # 已展开的嵌套字段：空字典、None 等值使所有子列缺失，不会再增加同名的普通列
+                if isinstance(value, dict):
+                    for sub, sub_value in value.items():
+                        flat[f"{field}.{sub}"] = sub_value
+            elif isinstance(value, dict) and value and field not in self._columns:
+                for sub, sub_value in value.items():
+                    flat[f"{field}.{sub}"] = sub_value
+            else:
+                flat[field] = value
+        return flat
+
+    def _add_column(self, name: str, value: Any):
+        self._columns[name] = _Column(_Column.kind_of(value), self.pool, len(self._keys))
+        field = name.split(".", 1)[0] if "." in name and name not in self._fields else name
+        self._fields.setdefault(field, []).append(name)
+
+    def _get_field(self, key: Hashable, field: str) -> Any:
+        index = self._index[key]
+        names = self._fields.get(field)
+        if names is None:
+            return _ABSENT
+        if names == [field]:
+            return self._columns[field].get(index)
+        nested = {}
+        prefix_length = len(field) + 1
+        for name in names:
+            value = self._columns[name].get(index)
+            if value is not _ABSENT:
+                nested[name[prefix_length:]] = value
+        return nested if nested else _ABSENT
+
+    def _set_field(self, key: Hashable, field: str, value: Any):
+        index = self._index[key]
+        names = self._fields.get(field)
+        if names is not None and names != [field]:
+            # 嵌套字段整体替换
+            flat = self._flatten({field: value}) if isinstance(value, dict) else {}
+            for name in flat:
+                if name not in self._columns:
+                    self._add_column(name, flat[name])
+            for name in self._fields[field]:
+                self._columns[name].set(index, flat.get(name, _ABSENT))
+            return
+        if field not in self._columns:
+            self._add_column(field, value)
+        self._columns[field].set(index, value)
@@ -0,0 +1,50 @@
+from functools import cached_property
+from typing import Any, Dict, Optional, Tuple
+
+class MessageEvent(dict):
+    """
+    消息事件 (IncomingMessage)
+
+    `message_receive` 事件的负载在分发前包装为 `MessageEvent`，它仍然是原来的 dict，可以照常用下标访问。
+    常用的派生视图在第一次访问时计算并缓存，同一事件的所有处理器共享结果，不必各自遍历消息段。
+
+    Args:
+        payload (dict): 事件负载
+        self_id (int, 可选): 机器人自身的 QQ 号，用于 `mentions_self`
+    """
+
+    def __init__(self, payload: Dict[str, Any], self_id: Optional[int] = None):
+        super().__init__(payload)
+        self.self_id = self_id
+
+    @property
+    def segments(self) -> Tuple[Dict[str, Any], ...]:
+        return self.get("segments", ())
+
+    @cached_property
+    def plain_text(self) -> str:
+        """全部文本消息段拼接而成的纯文本"""
+        return "".join(segment["data"]["text"] for segment in self.segments if segment["type"] == "text")
+
+    @cached_property
+    def mentions(self) -> Tuple[int, ...]:
+        """被提及的 QQ 号，按出现顺序排列"""
+        return tuple(segment["data"]["user_id"] for segment in self.segments if segment["type"] == "mention")
+
+    @cached_property
+    def mentions_self(self) -> bool:
+        """消息是否提及了机器人自身（不包括提及全体）"""
+        return self.self_id is not None and self.self_id in self.mentions
+
+    @cached_property
+    def reply_seq(self) -> Optional[int]:
+        """回复的消息序列号，消息不是回复时为 None"""
+        for segment in self.segments:
+            if segment["type"] == "reply":
+                return segment["data"]["message_seq"]
+        return None
+
+    @cached_property
+    def images(self) -> Tuple[Dict[str, Any], ...]:
+        """图片消息段的 data，包含 `resource_id`、`temp_url` 等字段"""
+        return tuple(segment["data"] for segment in self.segments if segment["type"] == "image")
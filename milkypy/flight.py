@@ -0,0 +1,29 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """
+    合并同一键的并发调用
+
+    同一键的调用进行中时，后来的调用者等待同一个结果而不是再次执行；调用完成后键即被移除。
+    调用者被取消不会取消进行中的调用，其他等待者仍能得到结果。
+    """
+
+    def __init__(self):
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        future = self._futures.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._futures[key] = future
+            future.add_done_callback(lambda _: self._futures.pop(key) if self._futures.get(key) is future else None)
+        return await asyncio.shield(future)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._futures
+
+    def __len__(self) -> int:
+        return len(self._futures)
@@ -0,0 +1,149 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, NamedTuple
+
+from .flight import SingleFlight
+
+class ForwardedItem(NamedTuple):
+    depth: int
+    forward_id: str
+    message: Dict[str, Any]
+
+def forward_ids(message: Dict[str, Any]) -> List[str]:
+    """消息中全部合并转发消息段的 forward_id"""
+    return [
+        segment["data"]["forward_id"] for segment in message.get("segments", ())
+        if segment.get("type") == "forward" and "forward_id" in segment.get("data", {})
+    ]
+
+class ForwardResolver:
+    """
+    合并转发消息解析器
+
+    合并转发可以嵌套，每一层都需要一次 `get_forwarded_messages` 调用。解析器并发展开整棵转发树，
+    并按 `forward_id` 缓存内容（合并转发的内容不会改变），同一转发的并发请求只调用一次 API。
+
+    Args:
+        client (MilkyClient): 客户端
+        max_depth (int, 可选): 最大展开深度，顶层为 1。默认为 5。
+        max_messages (int, 可选): 单次展开最多获取的消息数量。默认为 2000。
+        concurrency (int, 可选): 最多同时进行的 API 调用数量。默认为 8。
+        cache_size (int, 可选): 缓存的合并转发数量。默认为 1024。
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        max_depth: int = 5,
+        max_messages: int = 2000,
+        concurrency: int = 8,
+        cache_size: int = 1024,
+    ):
+        self.client = client
+        self.max_depth = max_depth
+        self.max_messages = max_messages
+        self.cache_size = cache_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._loading = SingleFlight()
+
+    async def fetch(self, forward_id: str) -> List[Dict[str, Any]]:
+        """获取一层合并转发的消息列表 (IncomingForwardedMessage[])，结果会被缓存，请勿修改"""
+        messages = self._cache.get(forward_id)
+        if messages is not None:
+            self._cache.move_to_end(forward_id)
+            self.client.metrics.inc("forward_cache_lookups", result="hit")
+            return messages
+        self.client.metrics.inc("forward_cache_lookups", result="miss")
+        return await self._loading.run(forward_id, lambda: self._load(forward_id))
+
+    async def iter_messages(self, forward_id: str) -> AsyncIterator[ForwardedItem]:
+        """
+        并发展开转发树，按获取完成的顺序逐层产出消息
+
+        同一层内的消息保持原有顺序，不同分支之间的顺序不确定。超过深度或数量限制的部分不再展开。
+
+        Yields:
+            ForwardedItem: `(depth, forward_id, message)`，顶层消息的 depth 为 1
+        """
+        results: asyncio.Queue = asyncio.Queue()
+        tasks: List[asyncio.Task] = []
+        budget = [self.max_messages]
+
+        def schedule(child_id: str, depth: int):
+            tasks.append(asyncio.ensure_future(self._fetch_into(results, child_id, depth)))
+
+        schedule(forward_id, 1)
+        pending = 1
+        try:
+            while pending:
+                depth, current_id, messages = await results.get()
+                pending -= 1
+                if isinstance(messages, BaseException):
+                    raise messages
+                for message in messages[:max(budget[0], 0)]:
+                    budget[0] -= 1
+                    yield ForwardedItem(depth, current_id, message)
+                    if depth < self.max_depth and budget[0] > 0:
+                        for child_id in forward_ids(message):
+                            schedule(child_id, depth + 1)
+                            pending += 1
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def flatten(self, forward_id: str) -> List[ForwardedItem]:
+        """展开整棵转发树并返回全部消息，参见 `iter_messages`"""
+        return [item async for item in self.iter_messages(forward_id)]
+
+    async def resolve(self, forward_id: str) -> List[Dict[str, Any]]:
+        """
+        展开整棵转发树并返回嵌套视图
+
+        返回消息列表的副本，其中每个已展开的合并转发消息段的 data 中增加 `messages` 字段，
+        包含该层的消息；未展开（超过深度或数量限制）的消息段保持不变。
+        """
+        budget = [self.max_messages]
+        return await self._resolve(forward_id, 1, budget)
+
+    async def _resolve(self, forward_id: str, depth: int, budget: List[int]) -> List[Dict[str, Any]]:
+        messages = (await self.fetch(forward_id))[:max(budget[0], 0)]
+        budget[0] -= len(messages)
+        result = [dict(message) for message in messages]
+        if depth >= self.max_depth:
+            return result
+
+        expansions = []
+        for message in result:
+            segments = message.get("segments")
+            if not segments or not forward_ids(message):
+                continue
+            message["segments"] = segments = [dict(segment) for segment in segments]
+            for segment in segments:
+                if segment.get("type") == "forward" and "forward_id" in segment.get("data", {}):
+                    expansions.append(segment)
+
+        async def expand(segment: Dict[str, Any]):
+            if budget[0] <= 0:
+                return
+            children = await self._resolve(segment["data"]["forward_id"], depth + 1, budget)
+            segment["data"] = {**segment["data"], "messages": children}
+
+        await asyncio.gather(*(expand(segment) for segment in expansions))
+        return result
+
+    async def _fetch_into(self, results: asyncio.Queue, forward_id: str, depth: int):
+        try:
+            messages = await self.fetch(forward_id)
+        except Exception as e:
+            messages = e
+        results.put_nowait((depth, forward_id, messages))
+
+    async def _load(self, forward_id: str) -> List[Dict[str, Any]]:
+        async with self._semaphore:
+            result = await self.client.get_forwarded_messages(forward_id)
+        messages = result["messages"]
+        self._cache[forward_id] = messages
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return messages
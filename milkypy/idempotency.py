@@ -0,0 +1,214 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+import httpx
+
+from .flight import SingleFlight
+from .message import SEND_ACTIONS, Message, Segment, to_dicts
+
+logger = logging.getLogger("milkypy")
+
+_Claim = Tuple[str, int, int]
+
+def is_ambiguous(error: BaseException) -> bool:
+    """请求可能已被协议端处理：读写超时、连接中断与服务端错误"""
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return False
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+def is_unsent(error: BaseException) -> bool:
+    """请求确定没有到达协议端，可以直接重试"""
+    return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)) or (
+        isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 429
+    )
+
+def fingerprint(segments: List[Union[Dict[str, Any], Segment]]) -> Tuple[Any, ...]:
+    """
+    消息内容的特征，用于比较发送的消息与历史消息
+
+    文本合并后比较；提及、表情、回复比较其 ID；图片等媒体只比较类型（接收格式中不含发送时的 URI）。
+    """
+    result: List[Any] = []
+    text = ""
+    for segment in to_dicts(segments):
+        kind = segment.get("type")
+        data = segment.get("data", {})
+        if kind == "text":
+            text += data.get("text", "")
+            continue
+        if text:
+            result.append(("text", text.strip()))
+            text = ""
+        if kind == "mention":
+            result.append((kind, data.get("user_id")))
+        elif kind == "face":
+            result.append((kind, str(data.get("face_id"))))
+        elif kind == "reply":
+            result.append((kind, data.get("message_seq")))
+        else:
+            result.append((kind,))
+    if text:
+        result.append(("text", text.strip()))
+    return tuple(result)
+
+class IdempotentSender:
+    """
+    幂等发送
+
+    带有幂等键的发送调用只会成功发送一次：
+
+    - 最近 `ttl` 秒内已成功的键直接返回记录的结果，同一个键的并发调用共享一次发送
+    - 请求确定未送达（连接失败、HTTP 429）时等待后重试
+    - 请求可能已送达（超时、连接中断、HTTP 5xx）时，先通过 `get_history_messages` 查找自身发送的、
+      内容相同的新消息，找到即视为成功，否则再重试
+    - 重试次数用尽时仍无法确认是否已送达的键，下次发送前会先在历史消息中确认
+
+    Args:
+        client (MilkyClient): 客户端
+        ttl (float, 可选): 记住已完成的键的时长（秒）。默认为 600。
+        retries (int, 可选): 最多重试次数。默认为 3。
+        backoff (float, 可选): 首次重试前的等待时间（秒），之后每次加倍。默认为 0.5。
+        history_limit (int, 可选): 确认时检查的最近消息数量。默认为 20。
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        ttl: float = 600.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        history_limit: int = 20,
+    ):
+        self.client = client
+        self.ttl = ttl
+        self.retries = retries
+        self.backoff = backoff
+        self.history_limit = history_limit
+        # 键 -> (过期时间, 结果, 认领的消息)
+        self._results: "OrderedDict[str, Tuple[float, Any, Optional[_Claim]]]" = OrderedDict()
+        self._inflight = SingleFlight()
+        # 已被某个键认领的消息，避免把同一条消息确认给两个键
+        self._claimed: Set[_Claim] = set()
+        # 无法确认是否已送达的键 -> 首次发送的时间
+        self._unconfirmed: Dict[str, float] = {}
+
+    async def send(self, action: str, params: Dict[str, Any], key: str) -> Any:
+        self._expire()
+        entry = self._results.get(key)
+        if entry is not None:
+            self.client.metrics.inc("idempotent_sends", result="replayed")
+            return entry[1]
+        return await self._inflight.run(key, lambda: self._send(action, params, key))
+
+    def forget(self, key: str):
+        self._unconfirmed.pop(key, None)
+        entry = self._results.pop(key, None)
+        if entry is not None:
+            self._claimed.discard(entry[2])
+
+    async def _send(self, action: str, params: Dict[str, Any], key: str) -> Any:
+        splitter = self.client._splitter
+        if splitter is not None and splitter.accepts(action, params):
+            # 拆分后的每条消息使用各自的键：超时时逐条确认，重试时已发送的部分不会重复发送
+            counter = itertools.count()
+            result = await splitter.send(
+                action, params, lambda action, params: self.send(action, params, f"{key}#{next(counter)}")
+            )
+            self._results[key] = (time.monotonic() + self.ttl, result, None)
+            return result
+
+        started = self._unconfirmed.pop(key, None)
+        unconfirmed = started is not None
+        if started is None:
+            started = time.time()
+        delay = self.backoff
+        error: Optional[BaseException] = None
+        outcome = None
+        # 最后一轮只用于确认最后一次请求是否已送达，不再发送
+        for attempt in range(self.retries + 2):
+            if attempt > self.retries and not unconfirmed:
+                break
+            if attempt:
+                if attempt <= self.retries:
+                    logger.warning(f"Send with idempotency key {key!r} failed ({error!r}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay *= 2
+            try:
+                if unconfirmed:
+                    # 之前的请求可能已送达：先在历史消息中查找，确认未送达后才重新发送
+                    result = await self._confirm(action, params, started)
+                    if result is not None:
+                        outcome = "confirmed"
+                        break
+                    unconfirmed = False
+                    if attempt > self.retries:
+                        break
+                result = await self.client._call_api(action, params)
+                outcome = "sent"
+                break
+            except Exception as e:
+                if unconfirmed:
+                    # 无法确认时不重新发送，下一轮再次确认
+                    logger.warning(f"Failed to confirm delivery through message history: {e!r}")
+                    error = error or e
+                elif is_ambiguous(e) or is_unsent(e):
+                    error = e
+                    unconfirmed = is_ambiguous(e)
+                else:
+                    raise
+        if outcome is None:
+            if unconfirmed:
+                self._unconfirmed[key] = started
+            raise error
+        self._remember(action, params, key, result)
+        self.client.metrics.inc("idempotent_sends", result=outcome)
+        return result
+
+    async def _confirm(self, action: str, params: Dict[str, Any], started: float) -> Optional[Dict[str, Any]]:
+        """在历史消息中查找这次发送的消息，没有找到时返回 None，无法获取历史消息时抛出异常"""
+        scene, peer_field = SEND_ACTIONS.get(action, (None, None))
+        if scene is None or not isinstance(params.get("message"), (list, Message)):
+            return None
+        self_id = self.client.self_id
+        # 直接请求协议端：本地消息存储与缓存中不可能有响应丢失的那条消息
+        if self_id is None:
+            self_id = (await self.client.call_api_http("get_login_info"))["uin"]
+        history = await self.client.call_api_http("get_history_messages", {
+            "message_scene": scene,
+            "peer_id": params[peer_field],
+            "limit": self.history_limit,
+        })
+        expected = fingerprint(params["message"])
+        # 协议端与客户端的时钟可能略有偏差
+        for message in reversed(history.get("messages", [])):
+            claim = (scene, params[peer_field], message["message_seq"])
+            if message.get("sender_id") == self_id and message.get("time", 0) >= started - 5 \
+                    and claim not in self._claimed and fingerprint(message.get("segments", [])) == expected:
+                return {"message_seq": message["message_seq"], "time": message.get("time")}
+        return None
+
+    def _remember(self, action: str, params: Dict[str, Any], key: str, result: Any):
+        claim = None
+        target = SEND_ACTIONS.get(action)
+        if target is not None and isinstance(result, dict) and "message_seq" in result:
+            claim = (target[0], params[target[1]], result["message_seq"])
+            self._claimed.add(claim)
+        self._results[key] = (time.monotonic() + self.ttl, result, claim)
+
+    def _expire(self):
+        now = time.monotonic()
+        while self._results:
+            key, entry = next(iter(self._results.items()))
+            if entry[0] > now:
+                break
+            del self._results[key]
+            self._claimed.discard(entry[2])
+        deadline = time.time() - self.ttl
+        for key in [key for key, started in self._unconfirmed.items() if started < deadline]:
+            del self._unconfirmed[key]
@@ -0,0 +1,159 @@
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from .metrics import Metrics
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+NEVER_DROP = "never_drop"
+
+POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST, NEVER_DROP)
+
+# 默认溢出策略：消息反压，低价值通知可丢弃，关键状态事件永不丢弃
+DEFAULT_POLICIES: Dict[str, str] = {
+    "message_receive": BLOCK,
+    "group_message_reaction": DROP_OLDEST,
+    "friend_nudge": DROP_NEWEST,
+    "group_nudge": DROP_NEWEST,
+    "bot_offline": NEVER_DROP,
+}
+
+class EventQueue:
+    """
+    有界事件队列
+
+    将 WebSocket 读取与事件处理解耦。队列满时根据事件类型的溢出策略处理新事件：
+
+    - `block`: 等待队列腾出空间，对 WebSocket 读取形成反压
+    - `drop_oldest`: 丢弃队列中最早的一条可丢弃事件（`drop_*` 策略的事件）以腾出空间
+    - `drop_newest`: 丢弃新到达的事件
+    - `never_drop`: 忽略容量限制直接入队
+
+    丢弃数量按事件类型记录在 `dropped` 中，并以 `events_dropped` 计数器导出到 `metrics`。
+
+    Args:
+        maxsize (int): 队列容量
+        policies (Dict[str, str], 可选): 事件类型到溢出策略的映射，与默认策略合并
+        default_policy (str, 可选): 未配置事件类型的溢出策略。默认为 "block"。
+        metrics (Metrics, 可选): 指标收集器
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        policies: Optional[Dict[str, str]] = None,
+        default_policy: str = BLOCK,
+        metrics: Optional[Metrics] = None,
+    ):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive.")
+        self.maxsize = maxsize
+        self.policies = dict(DEFAULT_POLICIES)
+        if policies:
+            self.policies.update(policies)
+        for policy in list(self.policies.values()) + [default_policy]:
+            if policy not in POLICIES:
+                raise ValueError(f"Unknown overflow policy: {policy}")
+        self.default_policy = default_policy
+        self.metrics = metrics or Metrics()
+
+        # 条目为 [event_type, item, alive]，被淘汰的条目仅标记为失效
+        self._entries: Deque[List[Any]] = deque()
+        self._droppable: Deque[List[Any]] = deque()
+        self._size = 0
+        self._unfinished = 0
+        self.dropped: Dict[str, int] = {}
+        self._not_full = asyncio.Condition()
+        self._not_empty = asyncio.Condition()
+        self._finished = asyncio.Event()
+        self._finished.set()
+
+    def policy_for(self, event_type: str) -> str:
+        return self.policies.get(event_type, self.default_policy)
+
+    def qsize(self) -> int:
+        return self._size
+
+    def full(self) -> bool:
+        return self._size >= self.maxsize
+
+    async def put(self, event_type: str, item: Any) -> bool:
+        """
+        按溢出策略放入一个事件
+
+        Returns:
+            bool: 事件是否入队
+        """
+        policy = self.policy_for(event_type)
+        if self.full():
+            if policy == BLOCK:
+                async with self._not_full:
+                    await self._not_full.wait_for(lambda: not self.full())
+            elif policy == DROP_NEWEST:
+                self._drop(event_type, policy)
+                return False
+            elif policy == DROP_OLDEST:
+                if not self._evict_oldest():
+                    self._drop(event_type, policy)
+                    return False
+            else:
+                self.metrics.inc("event_queue_overflow", event_type=event_type)
+
+        entry = [event_type, item, True]
+        self._entries.append(entry)
+        if policy in (DROP_OLDEST, DROP_NEWEST):
+            self._droppable.append(entry)
+        self._size += 1
+        self._unfinished += 1
+        self._finished.clear()
+        self.metrics.set("event_queue_size", self._size)
+        async with self._not_empty:
+            self._not_empty.notify()
+        return True
+
+    async def get(self) -> Any:
+        """取出最早的一个事件，队列为空时等待"""
+        async with self._not_empty:
+            await self._not_empty.wait_for(lambda: self._size > 0)
+        while True:
+            entry = self._entries.popleft()
+            if entry[2]:
+                break
+        entry[2] = False
+        while self._droppable and not self._droppable[0][2]:
+            self._droppable.popleft()
+        self._size -= 1
+        self.metrics.set("event_queue_size", self._size)
+        async with self._not_full:
+            self._not_full.notify()
+        return entry[1]
+
+    def task_done(self):
+        """标记一个已取出的事件处理完毕"""
+        if self._unfinished <= 0:
+            raise ValueError("task_done() called too many times")
+        self._unfinished -= 1
+        if self._unfinished == 0:
+            self._finished.set()
+
+    async def join(self):
+        """等待所有已入队的事件处理完毕"""
+        await self._finished.wait()
+
+    def _evict_oldest(self) -> bool:
+        while self._droppable:
+            entry = self._droppable.popleft()
+            if entry[2]:
+                entry[2] = False
+                entry[1] = None
+                self._size -= 1
+                self.task_done()
+                self._drop(entry[0], DROP_OLDEST)
+                return True
+        return False
+
+    def _drop(self, event_type: str, policy: str):
+        self.dropped[event_type] = self.dropped.get(event_type, 0) + 1
+        self.metrics.inc("events_dropped", event_type=event_type, policy=policy)
@@ -0,0 +1,284 @@
+import asyncio
+import base64
+import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Tuple, Union
+
+from .flight import SingleFlight
+from .metrics import Metrics
+
+MediaSource = Union[str, bytes, "os.PathLike[str]"]
+
+URI_SCHEMES = ("file://", "http://", "https://", "base64://")
+
+# 小于该大小的内容直接在事件循环中计算哈希
+_INLINE_HASH_LIMIT = 64 * 1024
+
+# 流式编码的分块大小，须为 3 的倍数以保证各块的 base64 结果可以直接拼接
+STREAM_CHUNK_SIZE = 3 * 256 * 1024
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+class StreamedFile:
+    """
+    流式发送的本地文件
+
+    可以放在 API 参数或消息段中任何需要 URI 的位置。`call_api_http` 发送请求时，
+    文件通过内存映射分块编码为 `base64://` URI 并直接写入请求体，内存中同时只保留一个分块，
+    而不是完整的 base64 字符串。
+
+    Args:
+        path (str | PathLike): 文件路径
+        chunk_size (int, 可选): 每次编码的原始字节数，须为 3 的倍数。默认为 768 KiB。
+    """
+
+    __slots__ = ("path", "size", "chunk_size")
+
+    PREFIX = b"base64://"
+
+    def __init__(self, path: "Union[str, os.PathLike[str]]", chunk_size: int = STREAM_CHUNK_SIZE):
+        if chunk_size % 3:
+            raise ValueError("chunk_size must be a multiple of 3")
+        self.path = os.path.abspath(os.fspath(path))
+        self.size = os.path.getsize(self.path)
+        self.chunk_size = chunk_size
+
+    @property
+    def encoded_length(self) -> int:
+        """编码后的 URI 长度（字节）"""
+        return len(self.PREFIX) + (self.size + 2) // 3 * 4
+
+    async def chunks(self, executor: Optional[Executor] = None) -> AsyncIterator[bytes]:
+        """逐块产出编码后的 URI，编码在线程池中进行"""
+        yield self.PREFIX
+        if not self.size:
+            return
+        loop = asyncio.get_running_loop()
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset in range(0, self.size, self.chunk_size):
+                yield await loop.run_in_executor(executor, _encode_range, mapped, offset, self.chunk_size)
+
+    def __repr__(self) -> str:
+        return f"StreamedFile({self.path!r}, size={self.size})"
+
+class MediaCache:
+    """
+    媒体编码缓存
+
+    将本地文件或字节内容编码为 `base64://` URI，并以内容哈希为键保存编码结果，
+    相同内容（即使来自不同的文件路径）只编码一次。文件按 `(路径, 修改时间, 大小)` 记住其内容哈希，
+    再次发送未修改的文件时无需重新读取。读取、哈希与编码都在线程池中进行，不阻塞事件循环。
+
+    协议端与客户端共享文件系统 (`local=True`) 时完全跳过 base64 编码：文件直接以 `file://` URI 发送，
+    字节内容以内容哈希为文件名写入暂存目录后发送，暂存文件超过 `staging_ttl` 后清理。
+
+    Args:
+        max_bytes (int, 可选): 编码结果占用的最大字节数，超出时淘汰最久未使用的内容。默认为 64 MiB。
+        executor (Executor, 可选): 执行编码的线程池，默认为事件循环的默认线程池
+        stream_threshold (int, 可选): 超过该大小的文件不再编码缓存，而是返回 `StreamedFile`
+            在发送时流式编码。默认为 8 MiB，为 None 时总是编码。
+        local (bool, 可选): 协议端是否与客户端共享文件系统。默认为 False。
+        staging_dir (str, 可选): 共享文件系统时字节内容的暂存目录，默认为新建的临时目录
+        staging_ttl (float, 可选): 暂存文件的保留时长（秒）。默认为 3600。
+        metrics (Metrics, 可选): 命中情况以 `media_cache_lookups{result}` 计数，
+            占用以 `media_cache_bytes` 导出
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        executor: Optional[Executor] = None,
+        stream_threshold: Optional[int] = 8 * 1024 * 1024,
+        local: bool = False,
+        staging_dir: Optional[str] = None,
+        staging_ttl: float = 3600.0,
+        metrics: Optional[Metrics] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.executor = executor
+        self.stream_threshold = stream_threshold
+        self.local = local
+        self.staging_dir = staging_dir
+        self.staging_ttl = staging_ttl
+        self._own_staging_dir = False
+        self._staged: Dict[str, float] = {}
+        self._last_sweep = time.monotonic()
+        self.metrics = metrics
+        self.size = 0
+        self._encoded: "OrderedDict[str, str]" = OrderedDict()
+        self._file_hashes: Dict[Tuple[str, int, int], str] = {}
+        # 同一内容的并发请求共享一次编码
+        self._loading = SingleFlight()
+
+    def __len__(self) -> int:
+        return len(self._encoded)
+
+    async def uri(self, source: MediaSource) -> Union[str, StreamedFile]:
+        """
+        获取媒体的 URI
+
+        Args:
+            source (str | bytes | PathLike): 本地文件路径或文件内容；已经是 `file://` `http(s)://`
+                `base64://` 格式的字符串原样返回
+
+        Returns:
+            str | StreamedFile: 共享文件系统时为 `file://` URI，否则为 `base64://` URI；
+                不共享文件系统且文件超过 `stream_threshold` 时返回 `StreamedFile`
+        """
+        if isinstance(source, str) and source.startswith(URI_SCHEMES):
+            return source
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            data = bytes(source)
+            if len(data) <= _INLINE_HASH_LIMIT:
+                digest = content_hash(data)
+            else:
+                digest = await self._run(content_hash, data)
+            if self.local:
+                return await self._loading.run(("stage", digest), lambda: self._stage(digest, data))
+            cached = self._get(digest)
+            if cached is not None:
+                return cached
+            return await self._loading.run(digest, lambda: self._encode_bytes(digest, data))
+
+        path = os.path.abspath(os.fspath(source))
+        if self.local:
+            return Path(path).as_uri()
+        stat = await self._run(os.stat, path)
+        if self.stream_threshold is not None and stat.st_size > self.stream_threshold:
+            return StreamedFile(path)
+        file_key = (path, stat.st_mtime_ns, stat.st_size)
+        digest = self._file_hashes.get(file_key)
+        if digest is None:
+            self._count("miss")
+        else:
+            cached = self._get(digest)
+            if cached is not None:
+                return cached
+        return await self._loading.run(file_key, lambda: self._encode_file(file_key))
+
+    def clear(self):
+        self._encoded.clear()
+        self._file_hashes.clear()
+        self.size = 0
+        self._update_size()
+
+    def close(self):
+        """删除全部暂存文件；暂存目录为自动创建的临时目录时一并删除"""
+        if self.staging_dir is None:
+            return
+        if self._own_staging_dir:
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+            self.staging_dir = None
+            self._own_staging_dir = False
+        else:
+            for path in self._staged:
+                _remove(path)
+        self._staged.clear()
+
+    async def _stage(self, digest: str, data: bytes) -> str:
+        if self.staging_dir is None:
+            self.staging_dir = tempfile.mkdtemp(prefix="milkypy-staging-")
+            self._own_staging_dir = True
+        path = os.path.join(self.staging_dir, digest)
+        if path not in self._staged:
+            await self._run(_write_file, path, data)
+        self._staged[path] = time.monotonic()
+        self._sweep()
+        return Path(path).as_uri()
+
+    def _sweep(self):
+        # 定期删除超过保留时长的暂存文件
+        now = time.monotonic()
+        if now - self._last_sweep < min(60.0, self.staging_ttl):
+            return
+        self._last_sweep = now
+        expired = [path for path, staged_at in self._staged.items() if now - staged_at > self.staging_ttl]
+        for path in expired:
+            del self._staged[path]
+        if expired:
+            asyncio.get_running_loop().run_in_executor(self.executor, _remove_all, expired)
+
+    def _get(self, digest: str) -> Optional[str]:
+        uri = self._encoded.get(digest)
+        if uri is not None:
+            self._encoded.move_to_end(digest)
+        self._count("hit" if uri is not None else "miss")
+        return uri
+
+    async def _encode_bytes(self, digest: str, data: bytes) -> str:
+        uri = await self._run(_to_base64_uri, data)
+        self._store(digest, uri)
+        return uri
+
+    async def _encode_file(self, file_key: Tuple[str, int, int]) -> str:
+        digest, uri = await self._run(_read_and_encode, file_key[0])
+        self._file_hashes[file_key] = digest
+        cached = self._encoded.get(digest)
+        if cached is not None:
+            # 内容与已缓存的文件相同，复用已有的编码结果
+            self._encoded.move_to_end(digest)
+            return cached
+        self._store(digest, uri)
+        return uri
+
+    def _store(self, digest: str, uri: str):
+        if len(uri) > self.max_bytes:
+            return
+        self._encoded[digest] = uri
+        self.size += len(uri)
+        while self.size > self.max_bytes:
+            evicted_digest, evicted = self._encoded.popitem(last=False)
+            self.size -= len(evicted)
+            self._file_hashes = {key: value for key, value in self._file_hashes.items() if value != evicted_digest}
+        self._update_size()
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def _count(self, result: str):
+        if self.metrics is not None:
+            self.metrics.inc("media_cache_lookups", result=result)
+
+    def _update_size(self):
+        if self.metrics is not None:
+            self.metrics.set("media_cache_bytes", self.size)
+
+def _to_base64_uri(data: bytes) -> str:
+    return "base64://" + base64.b64encode(data).decode("ascii")
+
+def _encode_range(mapped: mmap.mmap, offset: int, size: int) -> bytes:
+    encoded = base64.b64encode(mapped[offset:offset + size])
+    # 已编码的页面不再需要，及时解除映射，避免整个文件计入常驻内存
+    if hasattr(mmap, "MADV_DONTNEED") and offset % mmap.PAGESIZE == 0:
+        mapped.madvise(mmap.MADV_DONTNEED, offset, min(size, len(mapped) - offset))
+    return encoded
+
+def _write_file(path: str, data: bytes):
+    # 先写入临时文件再重命名，避免协议端读到写了一半的文件
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, "wb") as f:
+        f.write(data)
+    os.replace(temp, path)
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _remove_all(paths):
+    for path in paths:
+        _remove(path)
+
+def _read_and_encode(path: str) -> Tuple[str, str]:
+    with open(path, "rb") as f:
+        data = f.read()
+    return content_hash(data), _to_base64_uri(data)
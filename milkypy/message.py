@@ -1,4 +1,15 @@
-from typing import List, Optional
+import json
+import os
+from typing import Any, Iterable, Iterator, List, Optional, Tuple, Union
+
+# 媒体 URI，也可以是本地文件 (pathlib.Path) 或文件内容 (bytes)，发送时自动转换
+MediaURI = Union[str, bytes, "os.PathLike[str]"]
+
+# 发送消息 API -> (消息场景, 对端 ID 参数名)
+SEND_ACTIONS = {
+    "send_private_message": ("friend", "user_id"),
+    "send_group_message": ("group", "group_id"),
+}
 
 def Text(text: str) -> dict:
     """
@@ -12,16 +23,25 @@ def Text(text: str) -> dict:
     """
     return {"type": "text", "data": {"text": text}}
 
-def Mention(user_id: int) -> dict:
+def Mention(user_id: Union[int, str], resolver: Optional[Any] = None) -> dict:
     """
     构造提及消息段 (Mention Segment)
     
     Args:
-        user_id (int): 提及的 QQ 号 (int64)
+        user_id (int | str): 提及的 QQ 号 (int64)；提供 resolver 时也可以是群名片或昵称，如 "@小明"
+        resolver (可选): 提供 `resolve(name) -> Optional[int]` 的名称索引，如 `GroupRoster` 或 `NameIndex`
         
     Returns:
         dict: {"type": "mention", "data": {"user_id": user_id}}
+
+    Raises:
+        LookupError: 名称无法解析为任何成员
     """
+    if isinstance(user_id, str) and resolver is not None:
+        resolved = resolver.resolve(user_id)
+        if resolved is None:
+            raise LookupError(f"No member matches name: {user_id}")
+        user_id = resolved
     return {"type": "mention", "data": {"user_id": user_id}}
 
 def MentionAll() -> dict:
@@ -57,12 +77,13 @@ def Reply(message_seq: int) -> dict:
     """
     return {"type": "reply", "data": {"message_seq": message_seq}}
 
-def Image(uri: str, sub_type: str = "normal", summary: Optional[str] = None) -> dict:
+def Image(uri: MediaURI, sub_type: str = "normal", summary: Optional[str] = None) -> dict:
     """
     构造图片消息段 (Image Segment)
     
     Args:
-        uri (str): 文件 URI，支持 `file://` `http(s)://` `base64://` 三种格式
+        uri (str | Path | bytes): 文件 URI，支持 `file://` `http(s)://` `base64://` 三种格式，
+            也可以是本地文件路径 (`pathlib.Path`) 或文件内容 (`bytes`)
         sub_type (str, 可选): 图片类型 ("normal" | "sticker")。默认为 "normal"。
         summary (str, 可选): 图片预览文本。默认为 None。
         
@@ -74,25 +95,27 @@ def Image(uri: str, sub_type: str = "normal", summary: Optional[str] = None) ->
         data["summary"] = summary
     return {"type": "image", "data": data}
 
-def Record(uri: str) -> dict:
+def Record(uri: MediaURI) -> dict:
     """
     构造语音消息段 (Record Segment)
     
     Args:
-        uri (str): 文件 URI，支持 `file://` `http(s)://` `base64://` 三种格式
+        uri (str | Path | bytes): 文件 URI，支持 `file://` `http(s)://` `base64://` 三种格式，
+            也可以是本地文件路径 (`pathlib.Path`) 或文件内容 (`bytes`)
         
     Returns:
         dict: {"type": "record", "data": {"uri": uri}}
     """
     return {"type": "record", "data": {"uri": uri}}
 
-def Video(uri: str, thumb_uri: Optional[str] = None) -> dict:
+def Video(uri: MediaURI, thumb_uri: Optional[MediaURI] = None) -> dict:
     """
     构造视频消息段 (Video Segment)
     
     Args:
-        uri (str): 文件 URI，支持 `file://` `http(s)://` `base64://` 三种格式
-        thumb_uri (str, 可选): 封面图片 URI。默认为 None。
+        uri (str | Path | bytes): 文件 URI，支持 `file://` `http(s)://` `base64://` 三种格式，
+            也可以是本地文件路径 (`pathlib.Path`) 或文件内容 (`bytes`)
+        thumb_uri (str | Path | bytes, 可选): 封面图片 URI。默认为 None。
         
     Returns:
         dict: {"type": "video", "data": {...}}
@@ -113,3 +136,289 @@ def Forward(messages: List[dict]) -> dict:
         dict: {"type": "forward", "data": {"messages": messages}}
     """
     return {"type": "forward", "data": {"messages": messages}}
+
+class Segment:
+    """
+    消息段对象的基类
+
+    与返回 dict 的构造函数相比，消息段对象使用 `__slots__` 存储字段且不可修改，可以在模块级别构造一次后反复使用。
+    消息段对象可以直接放在消息段列表中发送，也可以组合成 `Message`。
+    """
+
+    __slots__ = ()
+    type = ""
+    # 值为空时从 data 中省略的字段
+    _optional: Tuple[str, ...] = ()
+
+    def __init__(self, *values: Any):
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def to_dict(self) -> dict:
+        """转换为消息段 dict，与对应构造函数的返回值相同"""
+        data = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if value or name not in self._optional:
+                data[name] = value
+        return {"type": self.type, "data": data}
+
+    def __eq__(self, other: Any) -> bool:
+        return type(other) is type(self) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self) -> str:
+        values = ", ".join(repr(getattr(self, name)) for name in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+class TextSegment(Segment):
+    """文本消息段，参见 `Text`"""
+    __slots__ = ("text",)
+    type = "text"
+
+    def __init__(self, text: str):
+        super().__init__(text)
+
+class MentionSegment(Segment):
+    """提及消息段，参见 `Mention`"""
+    __slots__ = ("user_id",)
+    type = "mention"
+
+    def __init__(self, user_id: int):
+        super().__init__(user_id)
+
+class MentionAllSegment(Segment):
+    """提及全体消息段，参见 `MentionAll`"""
+    __slots__ = ()
+    type = "mention_all"
+
+class FaceSegment(Segment):
+    """表情消息段，参见 `Face`"""
+    __slots__ = ("face_id",)
+    type = "face"
+
+    def __init__(self, face_id: str):
+        super().__init__(face_id)
+
+class ReplySegment(Segment):
+    """回复消息段，参见 `Reply`"""
+    __slots__ = ("message_seq",)
+    type = "reply"
+
+    def __init__(self, message_seq: int):
+        super().__init__(message_seq)
+
+class ImageSegment(Segment):
+    """图片消息段，参见 `Image`"""
+    __slots__ = ("uri", "sub_type", "summary")
+    type = "image"
+    _optional = ("summary",)
+
+    def __init__(self, uri: MediaURI, sub_type: str = "normal", summary: Optional[str] = None):
+        super().__init__(uri, sub_type, summary)
+
+class RecordSegment(Segment):
+    """语音消息段，参见 `Record`"""
+    __slots__ = ("uri",)
+    type = "record"
+
+    def __init__(self, uri: MediaURI):
+        super().__init__(uri)
+
+class VideoSegment(Segment):
+    """视频消息段，参见 `Video`"""
+    __slots__ = ("uri", "thumb_uri")
+    type = "video"
+    _optional = ("thumb_uri",)
+
+    def __init__(self, uri: MediaURI, thumb_uri: Optional[MediaURI] = None):
+        super().__init__(uri, thumb_uri)
+
+class ForwardSegment(Segment):
+    """合并转发消息段，参见 `Forward`"""
+    __slots__ = ("messages",)
+    type = "forward"
+
+    def __init__(self, messages: List[dict]):
+        super().__init__(tuple(messages))
+
+    def to_dict(self) -> dict:
+        return {"type": "forward", "data": {"messages": list(self.messages)}}
+
+MessagePart = Union[str, dict, Segment, "Message", Iterable[Union[str, dict, Segment]]]
+
+class Message:
+    """
+    不可修改的消息
+
+    由字符串、消息段对象、消息段 dict 或其他 `Message` 组合而成，相邻的文本消息段会被合并。
+    可以在任何接受消息段列表的地方使用，迭代时产出消息段 dict。
+
+    调用 `freeze()` 后消息被预先编码为 JSON，之后每次发送时编码结果原样拼接进请求体，适用于固定回复、帮助文本等反复发送的内容。
+
+    Args:
+        *parts (str | dict | Segment | Message | Iterable): 消息内容，字符串视为文本
+
+    Examples:
+        HELP = Message("可用命令：\n", "/help 显示帮助").freeze()
+        await bot.send_group_message(group_id, Message(ReplySegment(seq), HELP))
+    """
+
+    __slots__ = ("segments", "_encoded")
+
+    def __init__(self, *parts: MessagePart):
+        segments: List[Union[Segment, dict]] = []
+        for part in parts:
+            _append(segments, part)
+        object.__setattr__(self, "segments", tuple(segments))
+        object.__setattr__(self, "_encoded", None)
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("Message is immutable")
+
+    @property
+    def encoded(self) -> Optional[bytes]:
+        """`freeze()` 得到的 JSON 编码，未冻结时为 None"""
+        return self._encoded
+
+    def freeze(self) -> "Message":
+        """
+        预先编码为 JSON 并返回自身
+
+        Raises:
+            TypeError: 消息中包含本地文件 (`Path`) 或文件内容 (`bytes`)，请先用 `client.media_uri` 转换为 URI
+        """
+        if self._encoded is None:
+            try:
+                encoded = json.dumps(self.to_list(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            except TypeError as e:
+                raise TypeError(f"Cannot freeze message with local media, convert it with client.media_uri first: {e}") from None
+            object.__setattr__(self, "_encoded", encoded)
+        return self
+
+    def to_list(self) -> List[dict]:
+        """转换为消息段 dict 列表"""
+        return [segment.to_dict() if isinstance(segment, Segment) else segment for segment in self.segments]
+
+    def __iter__(self) -> Iterator[dict]:
+        for segment in self.segments:
+            yield segment.to_dict() if isinstance(segment, Segment) else segment
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    def __add__(self, other: MessagePart) -> "Message":
+        return Message(self, other)
+
+    def __radd__(self, other: MessagePart) -> "Message":
+        return Message(other, self)
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, Message) and self.segments == other.segments
+
+    def __repr__(self) -> str:
+        return f"Message({', '.join(map(repr, self.segments))})"
+
+def _append(segments: List[Union[Segment, dict]], part: MessagePart):
+    if isinstance(part, Message):
+        for segment in part.segments:
+            _append(segments, segment)
+        return
+    if isinstance(part, str):
+        part = TextSegment(part)
+    elif isinstance(part, dict):
+        if part.get("type") == "text":
+            part = TextSegment(part["data"]["text"])
+    elif not isinstance(part, Segment):
+        for item in part:
+            _append(segments, item)
+        return
+    if isinstance(part, TextSegment):
+        if not part.text:
+            return
+        if segments and isinstance(segments[-1], TextSegment):
+            part = TextSegment(segments[-1].text + part.text)
+            segments.pop()
+    segments.append(part)
+
+def to_dicts(message: Iterable[Union[dict, Segment]]) -> List[dict]:
+    """将可能包含消息段对象的消息段列表（或 `Message`）转换为消息段 dict 列表"""
+    if isinstance(message, Message):
+        return message.to_list()
+    return [segment.to_dict() if isinstance(segment, Segment) else segment for segment in message]
+
+# 需要单独成为一条消息的消息段类型
+STANDALONE_SEGMENTS = ("record", "video", "file", "forward", "market_face", "light_app", "xml")
+
+# 优先在这些字符之后切分长文本
+_BREAKS = ("\n", "。", "！", "？", ". ", "! ", "? ", "；", "; ", "，", ", ", " ")
+
+def split_message(message: List[Union[dict, Segment]], max_length: int = 3000, max_segments: int = 50) -> List[List[dict]]:
+    """
+    将过长的消息拆分为多条
+
+    长文本优先在换行、句末标点、逗号与空格处切分，不会拆开其他消息段；语音、视频、文件、合并转发等
+    消息段单独成为一条消息，回复消息段只保留在第一条消息中。
+
+    Args:
+        message (List[dict]): 消息段列表
+        max_length (int, 可选): 每条消息最多包含的文本长度。默认为 3000。
+        max_segments (int, 可选): 每条消息最多包含的消息段数量。默认为 50。
+
+    Returns:
+        List[List[dict]]: 拆分后的消息列表，不需要拆分时只包含原消息
+    """
+    message = to_dicts(message)
+    chunks: List[List[dict]] = []
+    current: List[dict] = []
+    length = 0
+
+    def flush():
+        nonlocal current, length
+        if current:
+            chunks.append(current)
+        current, length = [], 0
+
+    for segment in message:
+        kind = segment.get("type")
+        if kind in STANDALONE_SEGMENTS:
+            flush()
+            chunks.append([segment])
+            continue
+        if kind != "text":
+            if len(current) >= max_segments:
+                flush()
+            current.append(segment)
+            continue
+
+        text = segment["data"]["text"]
+        while text:
+            if length + len(text) <= max_length and len(current) < max_segments:
+                current.append(Text(text))
+                length += len(text)
+                break
+            if length or len(current) >= max_segments:
+                # 放不下时先结束当前消息，再在完整长度内切分；只有回复、提及等时与文本放在一起
+                flush()
+                continue
+            end, start = _cut(text, max_length)
+            current.append(Text(text[:end]))
+            flush()
+            text = text[start:]
+    flush()
+    return chunks or [list(message)]
+
+def _cut(text: str, limit: int) -> Tuple[int, int]:
+    # 返回 (本条的结束位置, 下一条的开始位置)：作为切分点的空白不保留在任何一条中
+    for separator in _BREAKS:
+        kept = len(separator.rstrip())
+        # 恰好从 limit 处开始的分隔符也可以作为切分点
+        index = text.rfind(separator, 0, limit + len(separator))
+        # 切分点过于靠前时尝试下一种分隔符，避免产生很短的消息
+        if index >= limit // 2 and 0 < index + kept <= limit:
+            return index + kept, index + len(separator)
+    return limit, limit
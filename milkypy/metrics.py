@@ -0,0 +1,67 @@
+from typing import Any, Dict, Tuple
+
+_Key = Tuple[str, Tuple[Tuple[str, Any], ...]]
+
+def _format_key(key: _Key) -> str:
+    name, labels = key
+    if not labels:
+        return name
+    inner = ",".join(f'{k}="{v}"' for k, v in labels)
+    return f"{name}{{{inner}}}"
+
+class Metrics:
+    """
+    客户端运行指标
+
+    维护计数器 (counter) 与仪表 (gauge) 两类指标，均可附带标签。
+    可以通过 `snapshot()` 获取字典形式，或通过 `to_prometheus()` 导出为 Prometheus 文本格式。
+    """
+
+    def __init__(self):
+        self._counters: Dict[_Key, float] = {}
+        self._gauges: Dict[_Key, float] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: Any):
+        """累加计数器"""
+        key = (name, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: Any):
+        """设置仪表的当前值"""
+        self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def get(self, name: str, **labels: Any) -> float:
+        """读取计数器或仪表的当前值，不存在时返回 0"""
+        key = (name, tuple(sorted(labels.items())))
+        if key in self._counters:
+            return self._counters[key]
+        return self._gauges.get(key, 0)
+
+    def total(self, name: str) -> float:
+        """计数器在所有标签组合下的总和"""
+        return sum(v for (n, _), v in self._counters.items() if n == name)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        获取所有指标的快照
+
+        Returns:
+            counters (Dict[str, float]): 计数器，键形如 `name{label="value"}`
+            gauges (Dict[str, float]): 仪表，键格式同上
+        """
+        return {
+            "counters": {_format_key(k): v for k, v in self._counters.items()},
+            "gauges": {_format_key(k): v for k, v in self._gauges.items()},
+        }
+
+    def to_prometheus(self, prefix: str = "milkypy_") -> str:
+        """导出为 Prometheus 文本格式"""
+        lines = []
+        for kind, values in (("counter", self._counters), ("gauge", self._gauges)):
+            seen = set()
+            for key in sorted(values, key=_format_key):
+                if key[0] not in seen:
+                    seen.add(key[0])
+                    lines.append(f"# TYPE {prefix}{key[0]} {kind}")
+                lines.append(f"{prefix}{_format_key(key)} {values[key]}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,311 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .flight import SingleFlight
+
+logger = logging.getLogger("milkypy")
+
+_MANIFEST = ".manifest.json"
+_UNSAFE = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+def safe_name(name: str) -> str:
+    """将群文件或文件夹名称转换为可以安全用作本地路径的名称"""
+    name = _UNSAFE.sub("_", name).strip(" .")
+    return name or "_"
+
+def unique_name(path: str, file_id: str) -> str:
+    """在文件名的扩展名之前加上 file_id，用于区分本地路径相同的文件"""
+    head, _, name = path.rpartition("/")
+    stem, dot, ext = name.rpartition(".")
+    if not stem:
+        stem, dot, ext = name, "", ""
+    name = f"{stem} [{safe_name(file_id)}]{dot}{ext}"
+    return f"{head}/{name}" if head else name
+
+class GroupFileMirror:
+    """
+    群文件镜像
+
+    并发遍历群文件夹树，与本地清单按 `file_id`、文件大小与上传时间比较，只下载新增或变化的文件，
+    中断的下载会在下次同步时通过 HTTP Range 请求续传。调用 `watch` 后还会根据 `group_file_upload`
+    事件增量下载新上传的文件。
+
+    每个群的文件保存在 `root/<group_id>/` 下，目录结构与群文件夹一致，清单保存在该目录的 `.manifest.json` 中。
+
+    Args:
+        client (MilkyClient): 客户端
+        root (str): 镜像根目录
+        concurrency (int, 可选): 最多同时下载的文件数量。默认为 4。
+        crawl_concurrency (int, 可选): 最多同时列举的文件夹数量。默认为 8。
+    """
+
+    def __init__(self, client: Any, root: str, concurrency: int = 4, crawl_concurrency: int = 8):
+        self.client = client
+        self.root = Path(root)
+        self.concurrency = concurrency
+        self.crawl_concurrency = crawl_concurrency
+        self.groups: Set[int] = set()
+        self._manifests: Dict[int, Dict[str, Dict[str, Any]]] = {}
+        self._downloading = SingleFlight()
+        self._unsaved: Dict[int, int] = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._watching = False
+
+    def watch(self, group_ids: Iterable[int]):
+        """根据 `group_file_upload` 事件增量镜像指定的群"""
+        self.groups.update(group_ids)
+        if not self._watching:
+            self._watching = True
+            self.client._observe("group_file_upload", self._on_upload)
+
+    async def crawl(self, group_id: int) -> Dict[str, Dict[str, Any]]:
+        """
+        并发遍历群文件夹树
+
+        同名文件（包括转换为本地名称后相同、或仅大小写不同的文件）中最早上传的一个保留原名，
+        其余在文件名中加上 file_id。
+
+        Returns:
+            Dict[str, Dict]: file_id -> {"file": GroupFileEntity, "path": 相对路径}
+        """
+        files: Dict[str, Dict[str, Any]] = {}
+        semaphore = asyncio.Semaphore(self.crawl_concurrency)
+
+        async def visit(folder_id: str, prefix: Tuple[str, ...]):
+            async with semaphore:
+                result = await self.client.get_group_files(group_id, folder_id)
+            for file in result.get("files", []):
+                files[file["file_id"]] = {
+                    "file": file,
+                    "path": "/".join(prefix + (safe_name(file["file_name"]),)),
+                }
+            await asyncio.gather(*(
+                visit(folder["folder_id"], prefix + (safe_name(folder["folder_name"]),))
+                for folder in result.get("folders", [])
+            ))
+
+        await visit("/", ())
+        taken: Set[str] = set()
+        for file_id, item in sorted(files.items(), key=lambda pair: (pair[1]["file"].get("uploaded_time") or 0, pair[0])):
+            if item["path"].casefold() in taken:
+                item["path"] = unique_name(item["path"], file_id)
+            taken.add(item["path"].casefold())
+        return files
+
+    async def sync(self, group_id: int, delete: bool = False) -> Dict[str, int]:
+        """
+        同步一个群的文件
+
+        Args:
+            group_id (int): 群号
+            delete (bool, 可选): 是否删除群内已不存在的本地文件。默认为 False。
+
+        Returns:
+            Dict[str, int]: {"total", "downloaded", "moved", "skipped", "failed", "removed"}
+        """
+        remote = await self.crawl(group_id)
+        manifest = self._manifest(group_id)
+        stats = {"total": len(remote), "downloaded": 0, "moved": 0, "skipped": 0, "failed": 0, "removed": 0}
+
+        # 群内已删除但仍保留在本地的文件，新文件不能覆盖它们
+        stale = {entry["path"].casefold() for file_id, entry in manifest.items() if file_id not in remote}
+        pending = []
+        moves = []
+        for file_id, item in remote.items():
+            file = item["file"]
+            if item["path"].casefold() in stale:
+                item["path"] = unique_name(item["path"], file_id)
+            known = manifest.get(file_id)
+            # 由上传事件镜像的文件没有记录上传时间
+            if known is not None and self._local_size(group_id, known["path"]) == file["file_size"] \
+                    and known.get("uploaded_time") in (None, file.get("uploaded_time")):
+                known["uploaded_time"] = file.get("uploaded_time")
+                if known["path"] != item["path"]:
+                    # 文件在群内被移动或重命名，只需移动本地文件
+                    moves.append((file_id, item["path"]))
+                    stats["moved"] += 1
+                else:
+                    stats["skipped"] += 1
+                continue
+            pending.append((file_id, item["path"], file["file_size"], file.get("uploaded_time")))
+        self._move(group_id, moves)
+
+        results = await asyncio.gather(
+            *(self.download(group_id, *args) for args in pending), return_exceptions=True
+        )
+        for (file_id, *_), result in zip(pending, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"Failed to mirror file {file_id} of group {group_id}: {result}")
+                stats["failed"] += 1
+            else:
+                stats["downloaded"] += 1
+
+        if delete:
+            for file_id in [file_id for file_id in manifest if file_id not in remote]:
+                self._local_path(group_id, manifest.pop(file_id)["path"]).unlink(missing_ok=True)
+                stats["removed"] += 1
+        self._save_manifest(group_id)
+        return stats
+
+    async def download(
+        self,
+        group_id: int,
+        file_id: str,
+        path: str,
+        size: Optional[int] = None,
+        uploaded_time: Optional[int] = None,
+    ) -> Path:
+        """下载单个文件到镜像目录中的相对路径 `path`，同一文件的并发请求只下载一次"""
+        return await self._downloading.run(
+            (group_id, file_id), lambda: self._download(group_id, file_id, path, size, uploaded_time)
+        )
+
+    async def _download(
+        self,
+        group_id: int,
+        file_id: str,
+        path: str,
+        size: Optional[int],
+        uploaded_time: Optional[int],
+    ) -> Path:
+        target = self._local_path(group_id, path)
+        # 未完成的下载以 file_id 命名，文件移动后仍可续传
+        partial = self._local_path(group_id, f".partial/{safe_name(file_id)}")
+        async with self._semaphore:
+            result = await self.client.get_group_file_download_url(group_id, file_id)
+            partial.parent.mkdir(parents=True, exist_ok=True)
+            offset = partial.stat().st_size if partial.exists() else 0
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            async with self.client._get_http().stream("GET", result["download_url"], headers=headers) as response:
+                # 416 表示上次已下载完整，只是未来得及移动到目标位置
+                if not (response.status_code == 416 and offset == size):
+                    response.raise_for_status()
+                    # 服务器不支持 Range 时从头下载
+                    mode = "ab" if offset and response.status_code == 206 else "wb"
+                    with open(partial, mode) as f:
+                        async for chunk in response.aiter_bytes():
+                            f.write(chunk)
+                            self.client.metrics.inc("mirror_bytes_downloaded", len(chunk))
+
+        actual = partial.stat().st_size
+        if size is not None and actual != size:
+            partial.unlink()
+            raise IOError(f"Size mismatch for {file_id}: expected {size}, got {actual}")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(partial, target)
+        self.client.metrics.inc("mirror_files_downloaded")
+        self._manifest(group_id)[file_id] = {
+            "path": path,
+            "size": target.stat().st_size,
+            "uploaded_time": uploaded_time,
+        }
+        # 定期保存清单，中断后已完成的文件无需重新下载
+        self._unsaved[group_id] = self._unsaved.get(group_id, 0) + 1
+        if self._unsaved[group_id] >= 20:
+            self._save_manifest(group_id)
+        return target
+
+    def _on_upload(self, payload: Dict[str, Any], self_id: Any = None):
+        group_id = payload["group_id"]
+        if group_id not in self.groups:
+            return
+        # 事件中没有所在文件夹，先保存到根目录，下次完整同步时会移动到正确位置
+        file_id = payload["file_id"]
+        path = safe_name(payload["file_name"])
+        taken = {entry["path"].casefold() for entry in self._manifest(group_id).values()}
+        if path.casefold() in taken or self._local_path(group_id, path).exists():
+            path = unique_name(path, file_id)
+        self.client._spawn(self._mirror_upload(group_id, file_id, path, payload.get("file_size")))
+
+    async def _mirror_upload(self, group_id: int, file_id: str, path: str, size: Optional[int]):
+        try:
+            await self.download(group_id, file_id, path, size)
+            self._save_manifest(group_id)
+        except Exception as e:
+            logger.warning(f"Failed to mirror uploaded file {file_id} of group {group_id}: {e}")
+
+    def _move(self, group_id: int, moves: List[Tuple[str, str]]):
+        # 先全部移到临时位置再移到目标位置，文件互换名称时不会互相覆盖
+        manifest = self._manifest(group_id)
+        staged = []
+        for file_id, path in moves:
+            temp = self._local_path(group_id, f".partial/moving-{safe_name(file_id)}")
+            temp.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self._local_path(group_id, manifest[file_id]["path"]), temp)
+            staged.append((file_id, path, temp))
+        for file_id, path, temp in staged:
+            target = self._local_path(group_id, path)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(temp, target)
+            manifest[file_id]["path"] = path
+
+    def _local_size(self, group_id: int, path: str) -> Optional[int]:
+        try:
+            return self._local_path(group_id, path).stat().st_size
+        except FileNotFoundError:
+            return None
+
+    def _local_path(self, group_id: int, path: str) -> Path:
+        return self.root / str(group_id) / path
+
+    def _manifest(self, group_id: int) -> Dict[str, Dict[str, Any]]:
+        manifest = self._manifests.get(group_id)
+        if manifest is None:
+            try:
+                manifest = json.loads(self._local_path(group_id, _MANIFEST).read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                manifest = {}
+            self._manifests[group_id] = manifest
+        return manifest
+
+    def _save_manifest(self, group_id: int):
+        self._unsaved.pop(group_id, None)
+        path = self._local_path(group_id, _MANIFEST)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_suffix(".tmp")
+        temp.write_text(json.dumps(self._manifest(group_id), ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(temp, path)
+
+async def _main(args: argparse.Namespace):
+    from .client import MilkyClient
+
+    client = MilkyClient(args.host, args.port, token=args.token)
+    mirror = GroupFileMirror(client, args.root, concurrency=args.concurrency)
+    if args.watch:
+        mirror.watch(args.group_ids)
+        await client.start()
+    try:
+        for group_id in args.group_ids:
+            stats = await mirror.sync(group_id, delete=args.delete)
+            print(f"group {group_id}: " + ", ".join(f"{key} {value}" for key, value in stats.items()))
+        if args.watch:
+            print("Watching for new uploads, press Ctrl+C to stop")
+            await asyncio.Event().wait()
+    finally:
+        await client.stop()
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m milkypy.mirror", description="Mirror QQ group files to a local directory")
+    parser.add_argument("group_ids", type=int, nargs="+", help="群号")
+    parser.add_argument("--root", default="group_files", help="镜像根目录")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3010)
+    parser.add_argument("--token")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时下载的文件数量")
+    parser.add_argument("--delete", action="store_true", help="删除群内已不存在的本地文件")
+    parser.add_argument("--watch", action="store_true", help="同步后继续根据上传事件增量镜像")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+# 匹配类型及其排序权重，数值越小越优先
+EXACT = 0
+PREFIX = 1
+SUBSTRING = 2
+FUZZY = 3
+
+def normalize_name(name: str) -> str:
+    """统一全角/半角与大小写，并去掉首尾空白与开头的 `@`"""
+    return unicodedata.normalize("NFKC", name).strip().lstrip("@").strip().casefold()
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    计算编辑距离 (Levenshtein)，超过 `limit` 时提前返回 `limit + 1`
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) > len(b):
+        a, b = b, a
+    previous = list(range(len(a) + 1))
+    for i, char_b in enumerate(b, 1):
+        current = [i] + [0] * len(a)
+        row_min = i
+        for j, char_a in enumerate(a, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            )
+            if current[j] < row_min:
+                row_min = current[j]
+        if row_min > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+def _grams(name: str) -> Set[str]:
+    # 单字与双字组合：单字覆盖单个汉字的查询，双字用于缩小候选集
+    grams = set(name)
+    grams.update(name[i:i + 2] for i in range(len(name) - 1))
+    return grams
+
+class NameMatch(NamedTuple):
+    user_id: int
+    name: str
+    kind: int
+    distance: int
+
+class NameIndex:
+    """
+    名称模糊索引
+
+    为一组用户的多个名称（如群名片与昵称）建立索引，支持前缀、子串与编辑距离查询，
+    并可以增量地加入或移除用户。名称在索引前经过 `normalize_name` 规范化。
+
+    - 前缀：有序列表上二分查找，O(log n + k)
+    - 子串：单字 / 双字倒排索引求交集后校验
+    - 编辑距离：在与查询共享字组合的候选中计算有界编辑距离
+    """
+
+    def __init__(self):
+        self._sorted: List[Tuple[str, int]] = []
+        self._grams: Dict[str, Set[Tuple[str, int]]] = {}
+        self._names: Dict[int, Set[str]] = {}
+        # 名称来源的优先级（如群名片优先于昵称），同分时用于排序
+        self._rank: Dict[Tuple[str, int], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._names
+
+    def add(self, user_id: int, names: Iterable[Optional[str]]):
+        """加入或替换一个用户的名称，越靠前的名称在同分时越优先"""
+        self.remove(user_id)
+        normalized: Set[str] = set()
+        for rank, name in enumerate(names):
+            if not name:
+                continue
+            name = normalize_name(name)
+            if not name or name in normalized:
+                continue
+            normalized.add(name)
+            entry = (name, user_id)
+            self._rank[entry] = rank
+            insort(self._sorted, entry)
+            for gram in _grams(name):
+                self._grams.setdefault(gram, set()).add(entry)
+        if normalized:
+            self._names[user_id] = normalized
+
+    def remove(self, user_id: int):
+        for name in self._names.pop(user_id, ()):
+            entry = (name, user_id)
+            self._rank.pop(entry, None)
+            index = bisect_left(self._sorted, entry)
+            if index < len(self._sorted) and self._sorted[index] == entry:
+                del self._sorted[index]
+            for gram in _grams(name):
+                entries = self._grams.get(gram)
+                if entries is not None:
+                    entries.discard(entry)
+                    if not entries:
+                        del self._grams[gram]
+
+    def prefix(self, query: str, limit: Optional[int] = None) -> List[int]:
+        """按名称前缀查找，返回按名称排序、去重后的 QQ 号"""
+        return self._unique(match.user_id for match in self._prefix_matches(normalize_name(query)))[:limit]
+
+    def substring(self, query: str, limit: Optional[int] = None) -> List[int]:
+        """按名称子串查找，返回较短名称优先、去重后的 QQ 号"""
+        matches = sorted(self._substring_matches(normalize_name(query)), key=self._order)
+        return self._unique(match.user_id for match in matches)[:limit]
+
+    def search(self, query: str, limit: int = 5, max_distance: int = 2) -> List[NameMatch]:
+        """
+        综合查找
+
+        依次考虑完全匹配、前缀、子串与编辑距离不超过 `max_distance` 的模糊匹配，
+        每个用户只保留其最优匹配，并按匹配类型、编辑距离、名称长度排序。
+
+        Args:
+            query (str): 查询名称，可以带有开头的 `@`
+            limit (int, 可选): 最多返回的结果数量。默认为 5。
+            max_distance (int, 可选): 模糊匹配允许的最大编辑距离，且不超过查询长度的一半。默认为 2。
+
+        Returns:
+            List[NameMatch]: `(user_id, name, kind, distance)` 列表
+        """
+        query = normalize_name(query)
+        if not query:
+            return []
+        best: Dict[int, NameMatch] = {}
+        for match in self._prefix_matches(query):
+            self._keep(best, match)
+        for match in self._substring_matches(query, prefixes=False):
+            self._keep(best, match)
+        # 短查询只允许较小的编辑距离，避免把任意短名称都当作匹配
+        max_distance = min(max_distance, len(query) // 2)
+        if max_distance > 0:
+            for match in self._fuzzy_matches(query, max_distance):
+                self._keep(best, match)
+        return sorted(best.values(), key=self._order)[:limit]
+
+    def resolve(self, query: str, max_distance: int = 2) -> Optional[int]:
+        """返回最佳匹配的 QQ 号，没有匹配时返回 None"""
+        matches = self.search(query, limit=1, max_distance=max_distance)
+        return matches[0].user_id if matches else None
+
+    def _prefix_matches(self, query: str) -> Iterable[NameMatch]:
+        index = bisect_left(self._sorted, (query, -1))
+        while index < len(self._sorted) and self._sorted[index][0].startswith(query):
+            name, user_id = self._sorted[index]
+            yield NameMatch(user_id, name, EXACT if name == query else PREFIX, len(name) - len(query))
+            index += 1
+
+    def _substring_matches(self, query: str, prefixes: bool = True) -> Iterable[NameMatch]:
+        # prefixes 为 False 时跳过以查询开头的名称（已由前缀匹配覆盖）
+        if not query:
+            return
+        grams = _grams(query)
+        if len(query) > 1:
+            grams = {gram for gram in grams if len(gram) == 2}
+        candidates: Optional[Set[Tuple[str, int]]] = None
+        for gram in sorted(grams, key=lambda g: len(self._grams.get(g, ()))):
+            entries = self._grams.get(gram)
+            if not entries:
+                return
+            candidates = set(entries) if candidates is None else candidates & entries
+            if not candidates:
+                return
+        for name, user_id in candidates or ():
+            if query not in name:
+                continue
+            if not name.startswith(query):
+                yield NameMatch(user_id, name, SUBSTRING, len(name) - len(query))
+            elif prefixes:
+                yield NameMatch(user_id, name, EXACT if name == query else PREFIX, len(name) - len(query))
+
+    def _fuzzy_matches(self, query: str, max_distance: int) -> Iterable[NameMatch]:
+        candidates: Set[Tuple[str, int]] = set()
+        for gram in _grams(query):
+            candidates.update(self._grams.get(gram, ()))
+        for name, user_id in candidates:
+            distance = edit_distance(query, name, max_distance)
+            if 0 < distance <= max_distance:
+                yield NameMatch(user_id, name, FUZZY, distance)
+
+    def _order(self, match: NameMatch):
+        return (match.kind, match.distance, self._rank.get((match.name, match.user_id), 0), len(match.name), match.name)
+
+    def _keep(self, best: Dict[int, NameMatch], match: NameMatch):
+        current = best.get(match.user_id)
+        if current is None or self._order(match) < self._order(current):
+            best[match.user_id] = match
+
+    @staticmethod
+    def _unique(user_ids: Iterable[int]) -> List[int]:
+        seen: Set[int] = set()
+        result = []
+        for user_id in user_ids:
+            if user_id not in seen:
+                seen.add(user_id)
+                result.append(user_id)
+        return result
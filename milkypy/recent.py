@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .metrics import Metrics
+from .store import sent_to_incoming
+
+_Key = Tuple[str, int, int]
+
+class RecentMessages:
+    """
+    最近消息缓存
+
+    以 `(message_scene, peer_id, message_seq)` 为键、按最近使用顺序保存最近收到或发送的消息，
+    用于直接应答回复消息段引用的 `get_message` 调用。超出容量时淘汰最久未使用的消息。
+
+    Args:
+        capacity (int, 可选): 最多保存的消息数量。默认为 2048。
+        metrics (Metrics, 可选): 命中情况以 `recent_messages_lookups{result}` 计数，
+            命中率以 `recent_messages_hit_ratio` 导出
+    """
+
+    def __init__(self, capacity: int = 2048, metrics: Optional[Metrics] = None):
+        self.capacity = capacity
+        self.metrics = metrics
+        self.hits = 0
+        self.misses = 0
+        self._messages: "OrderedDict[_Key, Dict[str, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def add(self, message: Dict[str, Any]):
+        """加入一条接收格式 (IncomingMessage) 的消息"""
+        key = (message["message_scene"], message["peer_id"], message["message_seq"])
+        self._messages[key] = message
+        self._messages.move_to_end(key)
+        if len(self._messages) > self.capacity:
+            self._messages.popitem(last=False)
+
+    def get(self, scene: str, peer_id: int, message_seq: int) -> Optional[Dict[str, Any]]:
+        key = (scene, peer_id, message_seq)
+        message = self._messages.get(key)
+        if message is None:
+            self._count("miss")
+            return None
+        self._messages.move_to_end(key)
+        self._count("hit")
+        return message
+
+    async def lookup(self, action: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """应答缓存中已有消息的 `get_message` 调用"""
+        if action != "get_message":
+            return None
+        message = self.get(params["message_scene"], params["peer_id"], params["message_seq"])
+        return {"message": message} if message is not None else None
+
+    def observe(self, payload: Dict[str, Any], self_id: Any = None):
+        """`message_receive` 事件观察者"""
+        self.add(payload)
+
+    def observe_result(self, action: str, params: Dict[str, Any], result: Any, self_id: Optional[int]):
+        """缓存自身发送的消息与 `get_message` 的返回结果"""
+        if action == "get_message":
+            if isinstance(result, dict) and result.get("message"):
+                self.add(result["message"])
+            return
+        message = sent_to_incoming(action, params, result, self_id)
+        if message is not None:
+            self.add(message)
+
+    def clear(self):
+        self._messages.clear()
+
+    def _count(self, result: str):
+        if result == "hit":
+            self.hits += 1
+        else:
+            self.misses += 1
+        if self.metrics is not None:
+            self.metrics.inc("recent_messages_lookups", result=result)
+            self.metrics.set("recent_messages_hit_ratio", self.hit_ratio)
@@ -0,0 +1,179 @@
+import asyncio
+import gzip
+import json
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple, Union
+
+class EventRecorder:
+    """
+    事件录制器
+
+    将 WebSocket 收到的原始事件帧连同接收时间戳追加写入 gzip 压缩的 JSON Lines 日志，
+    每行格式为 `[received_at, frame]`。
+
+    Args:
+        path (str): 日志文件路径，已存在时以追加方式写入
+        compresslevel (int, 可选): gzip 压缩等级。默认为 6。
+    """
+
+    def __init__(self, path: str, compresslevel: int = 6):
+        self.path = path
+        self.frames = 0
+        self._file = gzip.open(path, "at", encoding="utf-8", compresslevel=compresslevel)
+
+    def record(self, frame: Union[str, bytes], received_at: Optional[float] = None):
+        """
+        追加一条事件帧
+
+        Args:
+            frame (str | bytes): 原始事件帧
+            received_at (float, 可选): 接收时间戳，默认为当前时间
+        """
+        if isinstance(frame, bytes):
+            frame = frame.decode("utf-8")
+        if received_at is None:
+            received_at = time.time()
+        self._file.write(json.dumps([round(received_at, 3), frame], ensure_ascii=False))
+        self._file.write("\n")
+        self.frames += 1
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_events(path: str) -> Iterator[Tuple[float, str]]:
+    """
+    逐行读取录制日志
+
+    以流式方式解压，内存占用与日志大小无关。
+
+    Yields:
+        (received_at, frame): 接收时间戳与原始事件帧
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            received_at, frame = json.loads(line)
+            yield received_at, frame
+
+class ReplayResult:
+    """
+    回放结果
+
+    Attributes:
+        frames (int): 回放的事件帧数量
+        elapsed (float): 回放耗时（秒）
+        recorded_span (float): 日志覆盖的原始时间跨度（秒）
+        api_calls (Dict[str, int]): 按 API 名称统计的调用次数
+        calls (Deque[Tuple[str, dict]]): 最近捕获的 API 调用 `(action, params)`
+    """
+
+    def __init__(self, capture_limit: int):
+        self.frames = 0
+        self.elapsed = 0.0
+        self.recorded_span = 0.0
+        self.api_calls: Dict[str, int] = {}
+        self.calls: Deque[Tuple[str, Dict[str, Any]]] = deque(maxlen=capture_limit)
+
+    @property
+    def events_per_second(self) -> float:
+        return self.frames / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __repr__(self):
+        return (
+            f"ReplayResult(frames={self.frames}, elapsed={self.elapsed:.3f}, "
+            f"api_calls={sum(self.api_calls.values())})"
+        )
+
+async def replay(
+    client: Any,
+    path: str,
+    speed: Optional[float] = 1.0,
+    responder: Optional[Callable[[str, Dict[str, Any]], Any]] = None,
+    capture_limit: int = 1000,
+) -> ReplayResult:
+    """
+    将录制日志回放到客户端的事件处理流程中
+
+    回放期间客户端发出的 API 调用不会真正发送，而是被捕获并计入结果。事件延迟按录制时的时间线计算，
+    因此 `set_max_event_age` 的判断与录制时一致。
+
+    Args:
+        client (MilkyClient): 目标客户端
+        path (str): 录制日志路径
+        speed (float, 可选): 回放倍速，`1.0` 为原速，`None` 或 `0` 为不限速。默认为 1.0。
+        responder (Callable, 可选): `(action, params) -> data`，为被捕获的 API 调用提供返回值，
+            可以是协程函数。默认返回空字典。
+        capture_limit (int, 可选): 保留的最近 API 调用条数。默认为 1000。
+
+    Returns:
+        ReplayResult: 回放统计
+    """
+    result = ReplayResult(capture_limit)
+    overridden = "call_api_http" in vars(client)
+    original = client.call_api_http
+
+    async def capture(action: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        params = params or {}
+        result.api_calls[action] = result.api_calls.get(action, 0) + 1
+        result.calls.append((action, params))
+        if responder is None:
+            return {}
+        data = responder(action, params)
+        if asyncio.iscoroutine(data):
+            data = await data
+        return data
+
+    client.call_api_http = capture
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    first_at: Optional[float] = None
+    # 最近回放的事件帧的接收时间
+    current = [0.0]
+
+    def clock() -> float:
+        if speed and first_at is not None:
+            return first_at + (loop.time() - started) * speed
+        return current[0]
+
+    original_clock = client._clock
+    client._clock = clock
+    try:
+        for received_at, frame in read_events(path):
+            if first_at is None:
+                first_at = received_at
+            current[0] = received_at
+            offset = received_at - first_at
+            if speed:
+                delay = started + offset / speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif result.frames % 1000 == 0:
+                # 不限速时定期让出事件循环，避免饿死其他任务
+                await asyncio.sleep(0)
+            await client._handle_message(frame)
+            result.frames += 1
+            result.recorded_span = offset
+        # 启用事件队列时，等待队列中的事件处理完毕再结束回放
+        queue = getattr(client, "_event_queue", None)
+        if queue is not None:
+            await queue.join()
+    finally:
+        client._clock = original_clock
+        if overridden:
+            client.call_api_http = original
+        else:
+            del client.call_api_http
+        result.elapsed = loop.time() - started
+    return result
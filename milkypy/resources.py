@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from .flight import SingleFlight
+from .metrics import Metrics
+
+logger = logging.getLogger("milkypy")
+
+_INDEX_FILE = "index.json"
+
+class ResourceCache:
+    """
+    资源下载器与磁盘缓存
+
+    通过 `get_resource_temp_url` 获取临时链接后，使用客户端共享的连接池流式下载到磁盘，
+    文件以内容哈希命名，相同内容的不同资源只保存一份。缓存按最近使用顺序淘汰，
+    同一资源的并发请求只下载一次，同时进行的下载数量受 `concurrency` 限制。
+
+    Args:
+        client (MilkyClient): 客户端
+        directory (str): 缓存目录
+        max_bytes (int, 可选): 缓存文件占用的最大字节数。默认为 512 MiB。
+        concurrency (int, 可选): 最多同时进行的下载数量。默认为 8。
+        metrics (Metrics, 可选): 命中情况以 `resource_cache_lookups{result}` 计数，
+            下载量以 `resource_download_bytes` 累计，占用以 `resource_cache_bytes` 导出
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        directory: str,
+        max_bytes: int = 512 * 1024 * 1024,
+        concurrency: int = 8,
+        metrics: Optional[Metrics] = None,
+    ):
+        self.client = client
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.metrics = metrics
+        self.size = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # resource_id -> (内容哈希, 大小)，按最近使用排序
+        self._entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._refs: Dict[str, int] = {}
+        self._loading = SingleFlight()
+        self._objects = self.directory / "objects"
+        self._objects.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def __contains__(self, resource_id: str) -> bool:
+        return resource_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def fetch(self, resource_id: str) -> Path:
+        """
+        获取资源的本地文件，未缓存时下载
+
+        Args:
+            resource_id (str): 资源 ID
+
+        Returns:
+            Path: 缓存文件路径，文件可能在之后被淘汰，需要长期保存时请自行复制
+        """
+        entry = self._entries.get(resource_id)
+        if entry is not None:
+            path = self._objects / entry[0]
+            if path.exists():
+                self._entries.move_to_end(resource_id)
+                self._count("hit")
+                return path
+            self._forget(resource_id)
+        self._count("miss")
+        return await self._loading.run(resource_id, lambda: self._download(resource_id))
+
+    async def iter_bytes(self, resource_id: str, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+        """逐块读取资源内容，文件读取在线程池中进行"""
+        path = await self.fetch(resource_id)
+        loop = asyncio.get_running_loop()
+        with open(path, "rb") as f:
+            while True:
+                chunk = await loop.run_in_executor(None, f.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    async def read(self, resource_id: str) -> bytes:
+        """读取资源的全部内容"""
+        path = await self.fetch(resource_id)
+        return await asyncio.get_running_loop().run_in_executor(None, path.read_bytes)
+
+    def close(self):
+        """保存缓存索引"""
+        data = {resource_id: list(entry) for resource_id, entry in self._entries.items()}
+        temp = self.directory / f"{_INDEX_FILE}.tmp"
+        temp.write_text(json.dumps(data))
+        os.replace(temp, self.directory / _INDEX_FILE)
+
+    async def _download(self, resource_id: str) -> Path:
+        async with self._semaphore:
+            result = await self.client.get_resource_temp_url(resource_id)
+            temp = self._objects / f".{uuid.uuid4().hex}.part"
+            digest = hashlib.sha256()
+            size = 0
+            try:
+                async with self.client._get_http().stream("GET", result["url"]) as response:
+                    response.raise_for_status()
+                    with open(temp, "wb") as f:
+                        async for chunk in response.aiter_bytes():
+                            f.write(chunk)
+                            digest.update(chunk)
+                            size += len(chunk)
+            except BaseException:
+                temp.unlink(missing_ok=True)
+                raise
+
+        name = digest.hexdigest()
+        path = self._objects / name
+        if path.exists():
+            temp.unlink()
+        else:
+            os.replace(temp, path)
+        if self.metrics is not None:
+            self.metrics.inc("resource_download_bytes", size)
+        self._remember(resource_id, name, size)
+        self._evict()
+        return path
+
+    def _remember(self, resource_id: str, name: str, size: int):
+        self._forget(resource_id)
+        self._entries[resource_id] = (name, size)
+        if name not in self._refs:
+            self.size += size
+        self._refs[name] = self._refs.get(name, 0) + 1
+        self._update_size()
+
+    def _forget(self, resource_id: str):
+        entry = self._entries.pop(resource_id, None)
+        if entry is None:
+            return
+        name, size = entry
+        self._refs[name] -= 1
+        if self._refs[name] == 0:
+            # 没有其他资源引用相同内容时才删除文件
+            del self._refs[name]
+            self.size -= size
+            (self._objects / name).unlink(missing_ok=True)
+        self._update_size()
+
+    def _evict(self):
+        while self.size > self.max_bytes and len(self._entries) > 1:
+            self._forget(next(iter(self._entries)))
+
+    def _load_index(self):
+        index = self.directory / _INDEX_FILE
+        try:
+            data = json.loads(index.read_text())
+        except FileNotFoundError:
+            data = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load resource cache index: {e}")
+            data = {}
+        for resource_id, (name, size) in data.items():
+            if (self._objects / name).exists():
+                self._remember(resource_id, name, size)
+        # 删除未被索引引用的文件，例如中断的下载
+        for path in self._objects.iterdir():
+            if path.name not in self._refs:
+                path.unlink(missing_ok=True)
+        self._evict()
+
+    def _count(self, result: str):
+        if self.metrics is not None:
+            self.metrics.inc("resource_cache_lookups", result=result)
+
+    def _update_size(self):
+        if self.metrics is not None:
+            self.metrics.set("resource_cache_bytes", self.size)
@@ -0,0 +1,220 @@
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set
+
+from .columnar import EntityTable, StringPool
+from .flight import SingleFlight
+from .names import NameIndex
+
+logger = logging.getLogger("milkypy")
+
+ROLES = ("owner", "admin", "member")
+
+class GroupRoster:
+    """
+    群成员名册
+
+    以列式 `EntityTable` 保存一个群的全部成员信息，并维护以下索引：
+
+    - 按 QQ 号：O(1) 查找
+    - 按权限等级：O(1) 获取群主 / 管理员 / 普通成员集合
+    - 按群名片与昵称：`NameIndex` 支持前缀 O(log n)、子串与编辑距离查找
+    - 禁言成员：按禁言结束时间记录
+
+    Args:
+        group_id (int): 群号
+        members (Iterable[GroupMemberEntity], 可选): 初始成员列表
+        pool (StringPool, 可选): 字符串驻留池，多个群共享时可减少重复昵称的内存占用
+    """
+
+    def __init__(
+        self,
+        group_id: int,
+        members: Iterable[Dict[str, Any]] = (),
+        pool: Optional[StringPool] = None,
+    ):
+        self.group_id = group_id
+        self.members = EntityTable("user_id", pool)
+        self._by_role: Dict[str, Set[int]] = {role: set() for role in ROLES}
+        self.names = NameIndex()
+        self._muted: Dict[int, int] = {}
+        for member in members:
+            self.add(member)
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.members
+
+    def __iter__(self):
+        return iter(self.members.values())
+
+    def get(self, user_id: int) -> Optional[Mapping[str, Any]]:
+        return self.members.get(user_id)
+
+    def role_of(self, user_id: int) -> Optional[str]:
+        member = self.members.get(user_id)
+        return member.get("role") if member is not None else None
+
+    def is_admin(self, user_id: int) -> bool:
+        """是否为管理员或群主"""
+        return self.role_of(user_id) in ("admin", "owner")
+
+    def with_role(self, role: str) -> List[Mapping[str, Any]]:
+        """获取指定权限等级 ("owner" | "admin" | "member") 的全部成员"""
+        return [self.members[user_id] for user_id in self._by_role.get(role, ())]
+
+    def admins(self) -> List[Mapping[str, Any]]:
+        """获取群主与全部管理员"""
+        return self.with_role("owner") + self.with_role("admin")
+
+    def find_by_prefix(self, prefix: str, limit: Optional[int] = None) -> List[Mapping[str, Any]]:
+        """
+        按群名片或昵称前缀查找成员（不区分大小写与全角半角）
+
+        Args:
+            prefix (str): 名称前缀
+            limit (int, 可选): 最多返回的成员数量
+
+        Returns:
+            List[GroupMemberEntity]: 按名称排序的匹配成员，同一成员只出现一次
+        """
+        return [self.members[user_id] for user_id in self.names.prefix(prefix, limit)]
+
+    def search(self, query: str, limit: int = 5, max_distance: int = 2) -> List[Mapping[str, Any]]:
+        """
+        按群名片或昵称模糊查找成员
+
+        依次考虑完全匹配、前缀、子串与编辑距离匹配，按匹配程度排序，详见 `NameIndex.search`。
+        """
+        return [self.members[match.user_id] for match in self.names.search(query, limit, max_distance)]
+
+    def resolve(self, name: str, max_distance: int = 2) -> Optional[int]:
+        """将用户输入的名称（可以带有开头的 `@`）解析为最佳匹配成员的 QQ 号"""
+        return self.names.resolve(name, max_distance)
+
+    def muted(self, now: Optional[float] = None) -> List[Mapping[str, Any]]:
+        """获取当前处于禁言状态的成员"""
+        if now is None:
+            now = time.time()
+        return [self.members[user_id] for user_id, end in self._muted.items() if end > now]
+
+    def add(self, member: Dict[str, Any]):
+        """加入或替换一个成员"""
+        user_id = member["user_id"]
+        if user_id in self.members:
+            self.remove(user_id)
+        self.members[user_id] = member
+        self._by_role.setdefault(member.get("role", "member"), set()).add(user_id)
+        self.names.add(user_id, (member.get("card"), member.get("nickname")))
+        if member.get("shut_up_end_time"):
+            self._muted[user_id] = member["shut_up_end_time"]
+
+    def remove(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """移除一个成员"""
+        member = self.members.pop(user_id, None)
+        if member is None:
+            return None
+        self._by_role.get(member.get("role", "member"), set()).discard(user_id)
+        self.names.remove(user_id)
+        self._muted.pop(user_id, None)
+        return member
+
+    def set_role(self, user_id: int, role: str):
+        member = self.members.get(user_id)
+        if member is None:
+            return
+        self._by_role.get(member.get("role", "member"), set()).discard(user_id)
+        member["role"] = role
+        self._by_role.setdefault(role, set()).add(user_id)
+
+    def set_mute(self, user_id: int, end_time: int):
+        """设置禁言结束时间，为 0 时表示解除禁言"""
+        member = self.members.get(user_id)
+        if member is None:
+            return
+        member["shut_up_end_time"] = end_time
+        if end_time:
+            self._muted[user_id] = end_time
+        else:
+            self._muted.pop(user_id, None)
+
+class RosterManager:
+    """
+    群成员名册管理器
+
+    首次访问某个群时通过 `get_group_member_list` 加载名册，此后根据
+    `group_member_increase`、`group_member_decrease`、`group_admin_change` 与 `group_mute`
+    事件增量更新，查询无需再调用 API。名册保存在客户端的实体缓存 `entities.members` 中。
+
+    Args:
+        client (MilkyClient): 客户端
+        store (EntityStore): 保存名册的实体缓存
+    """
+
+    def __init__(self, client: Any, store: Any):
+        self.client = client
+        self.store = store
+        self._loading = SingleFlight()
+        client._observe("group_member_increase", self._on_member_increase)
+        client._observe("group_member_decrease", self._on_member_decrease)
+        client._observe("group_admin_change", self._on_admin_change)
+        client._observe("group_mute", self._on_mute)
+
+    def cached(self, group_id: int) -> Optional[GroupRoster]:
+        """获取已加载的名册，未加载时返回 None"""
+        return self.store.members.get(group_id)
+
+    async def get(self, group_id: int, refresh: bool = False) -> GroupRoster:
+        """
+        获取群成员名册，未加载时从 API 加载，同一群的并发加载只会请求一次
+
+        Args:
+            group_id (int): 群号
+            refresh (bool, 可选): 是否强制重新加载。默认为 False。
+        """
+        if not refresh:
+            roster = self.store.members.get(group_id)
+            if roster is not None:
+                return roster
+        return await self._loading.run(group_id, lambda: self._load(group_id))
+
+    async def resolve(self, group_id: int, name: str, max_distance: int = 2) -> Optional[int]:
+        """将群内的名称解析为成员 QQ 号，名册未加载时先加载"""
+        roster = await self.get(group_id)
+        return roster.resolve(name, max_distance)
+
+    async def _load(self, group_id: int) -> GroupRoster:
+        result = await self.client.get_group_member_list(group_id)
+        return self.store.set_members(group_id, result["members"])
+
+    async def _fetch_member(self, group_id: int, user_id: int):
+        try:
+            result = await self.client.get_group_member_info(group_id, user_id)
+        except Exception as e:
+            logger.warning(f"Failed to fetch new member {user_id} of group {group_id}: {e}")
+            return
+        roster = self.store.members.get(group_id)
+        if roster is not None:
+            roster.add(result["member"])
+
+    def _on_member_increase(self, payload: Dict[str, Any], self_id: Any = None):
+        if payload["group_id"] in self.store.members:
+            self.client._spawn(self._fetch_member(payload["group_id"], payload["user_id"]))
+
+    def _on_member_decrease(self, payload: Dict[str, Any], self_id: Any = None):
+        roster = self.store.members.get(payload["group_id"])
+        if roster is not None:
+            roster.remove(payload["user_id"])
+
+    def _on_admin_change(self, payload: Dict[str, Any], self_id: Any = None):
+        roster = self.store.members.get(payload["group_id"])
+        if roster is not None:
+            roster.set_role(payload["user_id"], "admin" if payload["is_set"] else "member")
+
+    def _on_mute(self, payload: Dict[str, Any], self_id: Any = None):
+        roster = self.store.members.get(payload["group_id"])
+        if roster is not None:
+            duration = payload.get("duration", 0)
+            roster.set_mute(payload["user_id"], int(time.time()) + duration if duration else 0)
@@ -0,0 +1,190 @@
+import re
+import sqlite3
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+from .store import SQLiteWorker
+
+# 中日韩字符没有空格分词，按连续字符切分为双字组合
+_CJK = "぀-ヿ㐀-䶿一-鿿豈-﫿가-힯"
+_TOKEN = re.compile(f"([{_CJK}]+)|([^\\W{_CJK}]+)")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    scene TEXT NOT NULL,
+    peer_id INTEGER NOT NULL,
+    message_seq INTEGER NOT NULL,
+    sender_id INTEGER,
+    time INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    UNIQUE (scene, peer_id, message_seq)
+);
+CREATE INDEX IF NOT EXISTS documents_time ON documents (time);
+CREATE INDEX IF NOT EXISTS documents_sender ON documents (sender_id, time);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(tokens, tokenize = 'unicode61 remove_diacritics 0');
+"""
+
+def tokenize(text: str) -> List[str]:
+    """
+    将文本切分为索引词
+
+    其他文字按单词切分并统一大小写；中日韩字符的连续片段 `abcd` 切分为 `ab bc cd d`，
+    使任意长度的子串都能以短语或前缀查询命中。
+    """
+    tokens: List[str] = []
+    for cjk, word in _TOKEN.findall(unicodedata.normalize("NFKC", text).casefold()):
+        if word:
+            tokens.append(word)
+        else:
+            tokens.extend(cjk[i:i + 2] for i in range(len(cjk)))
+    return tokens
+
+def build_query(query: str) -> Optional[str]:
+    """将用户输入转换为 FTS5 查询表达式，各个词之间为 AND 关系；没有可查询的词时返回 None"""
+    terms: List[str] = []
+    for cjk, word in _TOKEN.findall(unicodedata.normalize("NFKC", query).casefold()):
+        if word:
+            terms.append(f'"{word}"*')
+        elif len(cjk) == 1:
+            terms.append(f'"{cjk}"*')
+        else:
+            terms.append('"' + " ".join(cjk[i:i + 2] for i in range(len(cjk) - 1)) + '"')
+    return " ".join(terms) if terms else None
+
+def plain_text(segments: List[Dict[str, Any]]) -> str:
+    """拼接消息中全部文本消息段"""
+    return "".join(
+        segment["data"].get("text", "") for segment in segments
+        if isinstance(segment, dict) and segment.get("type") == "text"
+    )
+
+class SearchIndex:
+    """
+    消息全文索引
+
+    将收到消息中的文本写入 SQLite FTS5 索引，索引在后台线程中批量提交。
+    中日韩文本以双字组合索引，可以查询任意长度的子串。
+
+    Args:
+        path (str): 数据库路径，建议不要与 `MessageStore` 共用同一个文件
+        max_age (float, 可选): 索引保留时长（秒），为 None 时不清理
+        batch_size (int, 可选): 单次事务最多写入的消息数量。默认为 500。
+        flush_interval (float, 可选): 消息最长排队时间（秒）。默认为 1.0。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_age: Optional[float] = None,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+    ):
+        self.max_age = max_age
+        self._worker = SQLiteWorker(
+            path,
+            _SCHEMA,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            maintenance=self._prune if max_age else None,
+            name="milkypy-search-index",
+        )
+
+    def add(self, message: Dict[str, Any]):
+        """索引一条接收格式 (IncomingMessage) 的消息，没有文本的消息会被忽略"""
+        text = plain_text(message.get("segments") or [])
+        if not text.strip():
+            return
+        row = (
+            message["message_scene"], message["peer_id"], message["message_seq"],
+            message.get("sender_id"), message.get("time", 0), text,
+        )
+        tokens = " ".join(tokenize(text))
+
+        def insert(conn: sqlite3.Connection):
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO documents (scene, peer_id, message_seq, sender_id, time, text) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            if cursor.rowcount:
+                conn.execute("INSERT INTO documents_fts (rowid, tokens) VALUES (?, ?)", (cursor.lastrowid, tokens))
+
+        self._worker.write_many(insert)
+
+    def observe(self, payload: Dict[str, Any], self_id: Any = None):
+        """`message_receive` 事件观察者"""
+        self.add(payload)
+
+    async def search(
+        self,
+        query: str,
+        scene: Optional[str] = None,
+        peer_id: Optional[int] = None,
+        sender_id: Optional[int] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """
+        全文搜索消息
+
+        Args:
+            query (str): 查询文本，多个词之间以空格分隔，需全部命中
+            scene (str, 可选): 消息场景 ("friend" | "group" | "temp")
+            peer_id (int, 可选): 好友 QQ 号或群号
+            sender_id (int, 可选): 发送者 QQ 号
+            since (float, 可选): 起始时间戳（含）
+            until (float, 可选): 结束时间戳（不含）
+            limit (int, 可选): 最多返回的结果数量。默认为 20。
+
+        Returns:
+            List[Dict]: 按时间倒序排列的结果，包含 message_scene、peer_id、message_seq、sender_id、time 与 text
+        """
+        expression = build_query(query)
+        if expression is None:
+            return []
+        sql = [
+            "SELECT d.scene, d.peer_id, d.message_seq, d.sender_id, d.time, d.text "
+            "FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid WHERE documents_fts MATCH ?"
+        ]
+        args: List[Any] = [expression]
+        for condition, value in (
+            ("d.scene = ?", scene),
+            ("d.peer_id = ?", peer_id),
+            ("d.sender_id = ?", sender_id),
+            ("d.time >= ?", since),
+            ("d.time < ?", until),
+        ):
+            if value is not None:
+                sql.append(condition)
+                args.append(value)
+        query_sql = " AND ".join(sql) + " ORDER BY d.time DESC, d.message_seq DESC LIMIT ?"
+        args.append(limit)
+
+        rows = await self._worker.query(lambda conn: conn.execute(query_sql, args).fetchall())
+        return [
+            {
+                "message_scene": scene_,
+                "peer_id": peer,
+                "message_seq": seq,
+                "sender_id": sender,
+                "time": time_,
+                "text": text,
+            }
+            for scene_, peer, seq, sender, time_, text in rows
+        ]
+
+    async def flush(self):
+        await self._worker.flush()
+
+    def close(self):
+        self._worker.close()
+
+    def _prune(self, conn: sqlite3.Connection):
+        cutoff = int(time.time() - self.max_age)
+        conn.execute(
+            "DELETE FROM documents_fts WHERE rowid IN (SELECT id FROM documents WHERE time < ?)", (cutoff,)
+        )
+        conn.execute("DELETE FROM documents WHERE time < ?", (cutoff,))
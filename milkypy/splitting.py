@@ -0,0 +1,90 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .message import SEND_ACTIONS, Forward, Message, TextSegment, split_message
+
+class LongMessageSender:
+    """
+    长消息发送器
+
+    发送前用 `split_message` 检查消息长度，过长的消息拆分为多条依次发送，发送期间同一对端的其他长消息
+    需要等待，避免互相穿插。拆分结果超过 `forward_threshold` 条时改为打包成一条合并转发发送。
+
+    Args:
+        client (MilkyClient): 客户端
+        max_length (int, 可选): 每条消息最多包含的文本长度。默认为 3000。
+        max_segments (int, 可选): 每条消息最多包含的消息段数量。默认为 50。
+        forward_threshold (int, 可选): 拆分结果超过该条数时改为合并转发，为 None 时总是拆分发送
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        max_length: int = 3000,
+        max_segments: int = 50,
+        forward_threshold: Optional[int] = None,
+    ):
+        self.client = client
+        self.max_length = max_length
+        self.max_segments = max_segments
+        self.forward_threshold = forward_threshold
+        self._locks: Dict[Tuple[str, Any], asyncio.Lock] = {}
+        self._sender: Optional[Tuple[int, str]] = None
+
+    def accepts(self, action: str, params: Dict[str, Any]) -> bool:
+        message = params.get("message")
+        if action not in SEND_ACTIONS or not isinstance(message, (list, Message)):
+            return False
+        if len(message) > self.max_segments:
+            return True
+        length = 0
+        # Message 中的文本总是 TextSegment，不必转换为 dict
+        for segment in message.segments if isinstance(message, Message) else message:
+            if isinstance(segment, TextSegment):
+                length += len(segment.text)
+            elif isinstance(segment, dict) and segment.get("type") == "text":
+                length += len(segment["data"]["text"])
+        return length > self.max_length
+
+    async def send(
+        self,
+        action: str,
+        params: Dict[str, Any],
+        send: Optional[Callable[[str, Dict[str, Any]], Awaitable[Any]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        拆分并发送
+
+        Args:
+            action (str): 发送消息 API
+            params (dict): API 参数
+            send (Callable, 可选): 发送每一条消息的 `(action, params) -> result`，默认为 `client._call_api`
+
+        Returns:
+            Dict: 最后一条消息的发送结果，并增加 `message_seqs` 字段，包含全部消息的序列号
+        """
+        send = send or self.client._call_api
+        chunks = split_message(params["message"], self.max_length, self.max_segments)
+        if self.forward_threshold is not None and len(chunks) > self.forward_threshold:
+            user_id, name = await self._self_info()
+            forward = Forward([{"user_id": user_id, "sender_name": name, "segments": chunk} for chunk in chunks])
+            result = await send(action, {**params, "message": [forward]})
+            return {**result, "message_seqs": [result["message_seq"]]}
+
+        key = (action, params[SEND_ACTIONS[action][1]])
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        seqs: List[int] = []
+        result: Dict[str, Any] = {}
+        async with lock:
+            # 依次发送：并行发送的消息可能以不同的顺序到达
+            for chunk in chunks:
+                result = await send(action, {**params, "message": chunk})
+                seqs.append(result["message_seq"])
+        self.client.metrics.inc("long_messages_split", len(chunks) - 1)
+        return {**result, "message_seqs": seqs}
+
+    async def _self_info(self) -> Tuple[int, str]:
+        if self._sender is None:
+            info = await self.client.get_login_info()
+            self._sender = (info["uin"], info["nickname"])
+        return self._sender
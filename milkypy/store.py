@@ -0,0 +1,430 @@
+import asyncio
+import concurrent.futures
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .message import SEND_ACTIONS, Message, to_dicts
+
+logger = logging.getLogger("milkypy")
+
+# 可以由发送内容原样还原为接收格式的消息段类型
+SIMPLE_SEGMENTS = ("text", "mention", "mention_all", "face", "reply")
+
+def sent_to_incoming(
+    action: str,
+    params: Dict[str, Any],
+    result: Dict[str, Any],
+    self_id: Optional[int],
+) -> Optional[Dict[str, Any]]:
+    """
+    根据发送消息 API 的参数与返回值构造接收格式 (IncomingMessage) 的消息
+
+    仅当所有消息段都能原样还原（文本、提及、表情、回复）时返回结果，否则返回 None。
+    """
+    target = SEND_ACTIONS.get(action)
+    if target is None or self_id is None or not isinstance(result, dict) or "message_seq" not in result:
+        return None
+    segments = params.get("message")
+    if isinstance(segments, (list, Message)):
+        segments = to_dicts(segments)
+    if not isinstance(segments, list) or not all(
+        isinstance(segment, dict) and segment.get("type") in SIMPLE_SEGMENTS for segment in segments
+    ):
+        return None
+    scene, peer_field = target
+    return {
+        "message_scene": scene,
+        "peer_id": params[peer_field],
+        "message_seq": result["message_seq"],
+        "sender_id": self_id,
+        "time": result.get("time", int(time.time())),
+        "segments": segments,
+    }
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    scene TEXT NOT NULL,
+    peer_id INTEGER NOT NULL,
+    message_seq INTEGER NOT NULL,
+    sender_id INTEGER,
+    time INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (scene, peer_id, message_seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS messages_time ON messages (time);
+CREATE TABLE IF NOT EXISTS coverage (
+    scene TEXT NOT NULL,
+    peer_id INTEGER NOT NULL,
+    start_seq INTEGER NOT NULL,
+    end_seq INTEGER NOT NULL,
+    PRIMARY KEY (scene, peer_id, start_seq)
+);
+"""
+
+_Key = Tuple[str, int]
+
+class SQLiteWorker:
+    """
+    SQLite 后台线程
+
+    所有数据库操作都在同一个后台线程中执行：写操作排队后批量提交，读操作在执行前先提交
+    所有排队的写操作，保证读到最新数据。事件循环通过 `query` 异步等待读结果，不会被阻塞。
+
+    Args:
+        path (str): 数据库路径
+        schema (str): 初始化脚本
+        batch_size (int, 可选): 单次事务最多提交的写操作数量。默认为 500。
+        flush_interval (float, 可选): 写操作最长排队时间（秒）。默认为 0.5。
+        maintenance (Callable, 可选): 在后台线程中定期调用的 `conn -> None` 函数
+        maintenance_interval (float, 可选): 定期维护的间隔（秒）。默认为 60。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        schema: str,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        maintenance: Optional[Callable[[sqlite3.Connection], None]] = None,
+        maintenance_interval: float = 60.0,
+        name: str = "milkypy-sqlite",
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.maintenance = maintenance
+        self.maintenance_interval = maintenance_interval
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._ready = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, args=(schema,), name=name, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    def write(self, sql: str, args: Tuple[Any, ...] = ()):
+        """排队一条写操作"""
+        self._queue.put(("write", sql, args))
+
+    def write_many(self, fn: Callable[[sqlite3.Connection], None]):
+        """排队一个在写事务中执行的 `conn -> None` 函数"""
+        self._queue.put(("call", fn))
+
+    async def query(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """在后台线程中执行 `conn -> result` 并异步返回结果"""
+        return await asyncio.wrap_future(self.submit(fn))
+
+    def submit(self, fn: Callable[[sqlite3.Connection], Any]) -> concurrent.futures.Future:
+        """在后台线程中执行 `conn -> result`，返回 `concurrent.futures.Future`"""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        self._queue.put(("query", fn, future))
+        return future
+
+    async def flush(self):
+        """等待此前排队的写操作全部提交"""
+        await self.query(lambda conn: None)
+
+    def close(self):
+        """提交剩余写操作并关闭数据库，会阻塞直到后台线程退出"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self, schema: str):
+        try:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(schema)
+        except BaseException as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+
+        pending: List[Any] = []
+        deadline: Optional[float] = None
+        next_maintenance = time.monotonic() + self.maintenance_interval
+        running = True
+        while running:
+            timeout = None
+            now = time.monotonic()
+            if deadline is not None:
+                timeout = max(0.0, deadline - now)
+            if self.maintenance is not None:
+                until_maintenance = max(0.0, next_maintenance - now)
+                timeout = until_maintenance if timeout is None else min(timeout, until_maintenance)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+
+            if item is None:
+                running = False
+            elif item and item[0] in ("write", "call"):
+                pending.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(pending) < self.batch_size:
+                    continue
+
+            if pending and (not running or not item or item[0] == "query" or len(pending) >= self.batch_size
+                            or time.monotonic() >= deadline):
+                self._commit(conn, pending)
+                pending = []
+                deadline = None
+
+            if item and item[0] == "query":
+                _, fn, future = item
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(fn(conn))
+                    except Exception as e:
+                        future.set_exception(e)
+
+            if self.maintenance is not None and time.monotonic() >= next_maintenance:
+                try:
+                    with conn:
+                        self.maintenance(conn)
+                except Exception as e:
+                    logger.error(f"SQLite maintenance failed: {e}")
+                next_maintenance = time.monotonic() + self.maintenance_interval
+        conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, pending: List[Any]):
+        try:
+            with conn:
+                for item in pending:
+                    if item[0] == "write":
+                        conn.execute(item[1], item[2])
+                    else:
+                        item[1](conn)
+        except Exception as e:
+            logger.error(f"Failed to commit {len(pending)} queued writes: {e}")
+
+class MessageStore:
+    """
+    本地消息存储
+
+    将收到的每条消息（以及可还原的自身发送消息）写入 SQLite，以 `(message_scene, peer_id, message_seq)`
+    为主键，写入在后台线程中批量提交。同时记录每个会话中连续收到的消息序列号区间，
+    当 `get_message` / `get_history_messages` 请求的范围完全落在已知区间内时直接在本地应答。
+
+    Args:
+        path (str): 数据库路径
+        max_age (float, 可选): 消息保留时长（秒），为 None 时不按时间清理
+        max_messages (int, 可选): 最多保留的消息条数，为 None 时不限制
+        batch_size (int, 可选): 单次事务最多写入的消息数量。默认为 500。
+        flush_interval (float, 可选): 消息最长排队时间（秒）。默认为 0.5。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_age: Optional[float] = None,
+        max_messages: Optional[int] = None,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+    ):
+        self.max_age = max_age
+        self.max_messages = max_messages
+        self._worker = SQLiteWorker(
+            path,
+            _SCHEMA,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            maintenance=self._prune if (max_age or max_messages) else None,
+            name="milkypy-message-store",
+        )
+        # 已知连续的消息序列号区间，以及本次连接中各会话正在延伸的区间
+        self._coverage: Dict[_Key, List[List[int]]] = {}
+        self._open: Dict[_Key, List[int]] = {}
+        self._versions: Dict[_Key, int] = {}
+        self._coverage_lock = threading.Lock()
+        self._load_coverage()
+
+    def record(self, message: Dict[str, Any]):
+        """记录一条接收格式 (IncomingMessage) 的消息"""
+        key = (message["message_scene"], message["peer_id"])
+        seq = message["message_seq"]
+        self._worker.write(
+            "INSERT OR REPLACE INTO messages (scene, peer_id, message_seq, sender_id, time, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key[0], key[1], seq, message.get("sender_id"), message.get("time", 0),
+             json.dumps(message, ensure_ascii=False)),
+        )
+        self._extend(key, seq)
+
+    def break_continuity(self):
+        """连接断开后调用：之后收到的消息不再与此前的区间相连"""
+        self._open.clear()
+
+    def covers(self, scene: str, peer_id: int, low: int, high: int) -> bool:
+        """`[low, high]` 内的消息是否都已被记录"""
+        with self._coverage_lock:
+            return any(start <= low and high <= end for start, end in self._coverage.get((scene, peer_id), ()))
+
+    def latest_seq(self, scene: str, peer_id: int) -> Optional[int]:
+        """本次连接中该会话最新的消息序列号，连接中断后未再收到消息时为 None"""
+        interval = self._open.get((scene, peer_id))
+        return interval[1] if interval is not None else None
+
+    async def get_message(self, scene: str, peer_id: int, message_seq: int) -> Optional[Dict[str, Any]]:
+        def fetch(conn: sqlite3.Connection):
+            return conn.execute(
+                "SELECT data FROM messages WHERE scene = ? AND peer_id = ? AND message_seq = ?",
+                (scene, peer_id, message_seq),
+            ).fetchone()
+
+        row = await self._worker.query(fetch)
+        return json.loads(row[0]) if row else None
+
+    async def get_range(self, scene: str, peer_id: int, low: int, high: int) -> List[Dict[str, Any]]:
+        def fetch(conn: sqlite3.Connection):
+            return conn.execute(
+                "SELECT data FROM messages WHERE scene = ? AND peer_id = ? AND message_seq BETWEEN ? AND ? "
+                "ORDER BY message_seq",
+                (scene, peer_id, low, high),
+            ).fetchall()
+
+        return [json.loads(row[0]) for row in await self._worker.query(fetch)]
+
+    async def lookup(self, action: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """尝试在本地应答 API 调用，无法应答时返回 None"""
+        if action == "get_message":
+            message = await self.get_message(params["message_scene"], params["peer_id"], params["message_seq"])
+            return {"message": message} if message is not None else None
+
+        if action == "get_history_messages":
+            scene, peer_id = params["message_scene"], params["peer_id"]
+            high = params.get("start_message_seq")
+            if high is None:
+                high = self.latest_seq(scene, peer_id)
+                if high is None:
+                    return None
+            low = max(1, high - min(params.get("limit") or 20, 30) + 1)
+            if not self.covers(scene, peer_id, low, high):
+                return None
+            messages = await self.get_range(scene, peer_id, low, high)
+            return {"messages": messages, "next_message_seq": low - 1}
+
+        return None
+
+    def observe(self, payload: Dict[str, Any], self_id: Any = None):
+        """`message_receive` 事件观察者"""
+        self.record(payload)
+
+    def observe_result(self, action: str, params: Dict[str, Any], result: Any, self_id: Optional[int]):
+        """记录自身发送的消息；无法还原内容时断开该会话的区间，避免把缺失的消息当作已知"""
+        target = SEND_ACTIONS.get(action)
+        if target is None:
+            return
+        message = sent_to_incoming(action, params, result, self_id)
+        if message is not None:
+            self.record(message)
+        else:
+            self._open.pop((target[0], params.get(target[1])), None)
+
+    async def flush(self):
+        await self._worker.flush()
+
+    def close(self):
+        self._worker.close()
+
+    def _extend(self, key: _Key, seq: int):
+        interval = self._open.get(key)
+        if interval is not None and interval[0] <= seq <= interval[1]:
+            return
+        with self._coverage_lock:
+            if interval is not None and interval[1] + 1 == seq:
+                interval[1] = seq
+            else:
+                interval = [seq, seq]
+                self._coverage.setdefault(key, []).append(interval)
+                self._open[key] = interval
+            intervals = self._coverage[key] = _merge(self._coverage[key])
+            # 合并后当前区间可能被并入更早的区间
+            for merged in intervals:
+                if merged[0] <= seq <= merged[1]:
+                    self._open[key] = merged
+                    break
+            version = self._versions[key] = self._versions.get(key, 0) + 1
+            snapshot = [tuple(item) for item in intervals]
+        self._worker.write_many(lambda conn: self._persist_coverage(conn, key, version, snapshot))
+
+    def _persist_coverage(self, conn: sqlite3.Connection, key: _Key, version: int, snapshot: List[Tuple[int, int]]):
+        # 区间快照与消息按入队顺序提交；同一会话只需写入最新的快照
+        if self._versions.get(key) == version:
+            _save_coverage(conn, key, snapshot)
+
+    def _load_coverage(self):
+        rows = self._worker.submit(
+            lambda conn: conn.execute("SELECT scene, peer_id, start_seq, end_seq FROM coverage").fetchall()
+        ).result()
+        for scene, peer_id, start, end in rows:
+            self._coverage.setdefault((scene, peer_id), []).append([start, end])
+        for key in self._coverage:
+            self._coverage[key] = _merge(self._coverage[key])
+
+    def _prune(self, conn: sqlite3.Connection):
+        # 在后台线程中执行：按保留时长与条数清理旧消息，并收缩对应的区间
+        where: List[str] = []
+        args: List[Any] = []
+        if self.max_age:
+            where.append("time < ?")
+            args.append(int(time.time() - self.max_age))
+        if self.max_messages:
+            row = conn.execute(
+                "SELECT time, message_seq FROM messages ORDER BY time DESC, message_seq DESC LIMIT 1 OFFSET ?",
+                (self.max_messages,),
+            ).fetchone()
+            if row is not None:
+                where.append("time < ? OR (time = ? AND message_seq <= ?)")
+                args.extend((row[0], row[0], row[1]))
+        if not where:
+            return
+        condition = " OR ".join(f"({item})" for item in where)
+        removed = conn.execute(
+            f"SELECT scene, peer_id, MAX(message_seq) FROM messages WHERE {condition} GROUP BY scene, peer_id",
+            args,
+        ).fetchall()
+        if not removed:
+            return
+        conn.execute(f"DELETE FROM messages WHERE {condition}", args)
+        with self._coverage_lock:
+            for scene, peer_id, max_seq in removed:
+                key = (scene, peer_id)
+                intervals = self._coverage.get(key, [])
+                for interval in intervals:
+                    if interval[0] <= max_seq:
+                        interval[0] = max_seq + 1
+                kept = [interval for interval in intervals if interval[0] <= interval[1]]
+                if key in self._open and self._open[key] not in kept:
+                    del self._open[key]
+                self._coverage[key] = kept
+                _save_coverage(conn, key, [tuple(item) for item in kept])
+        logger.debug(f"Pruned messages from {len(removed)} conversations")
+
+def _merge(intervals: List[List[int]]) -> List[List[int]]:
+    intervals.sort(key=lambda item: item[0])
+    merged: List[List[int]] = []
+    for interval in intervals:
+        if merged and interval[0] <= merged[-1][1] + 1:
+            if interval[1] > merged[-1][1]:
+                merged[-1][1] = interval[1]
+        else:
+            merged.append(interval)
+    return merged
+
+def _save_coverage(conn: sqlite3.Connection, key: _Key, intervals: List[Tuple[int, int]]):
+    conn.execute("DELETE FROM coverage WHERE scene = ? AND peer_id = ?", key)
+    conn.executemany(
+        "INSERT INTO coverage (scene, peer_id, start_seq, end_seq) VALUES (?, ?, ?, ?)",
+        [(key[0], key[1], start, end) for start, end in intervals],
+    )
@@ -0,0 +1,131 @@
+import asyncio
+import heapq
+import itertools
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+# (事件类型, 对端 ID, 发送者 ID)，None 表示不限
+_Key = Tuple[str, Any, Any]
+
+class _Waiter:
+    __slots__ = ("key", "check", "future")
+
+    def __init__(self, key: _Key, check: Optional[Callable[[Dict[str, Any]], bool]], future: asyncio.Future):
+        self.key = key
+        self.check = check
+        self.future = future
+
+class EventWaiters:
+    """
+    等待中的事件
+
+    等待者按 `(事件类型, 对端, 发送者)` 建立索引，每个事件只需查找至多 4 个键（对端与发送者各自可以不限），
+    与等待者数量无关。超时由一个按截止时间排序的堆与单个定时器管理。
+
+    事件的对端取 `peer_id`（没有时取 `group_id`），发送者取 `sender_id`（没有时取 `user_id`）。
+
+    Args:
+        client (MilkyClient): 客户端
+    """
+
+    def __init__(self, client: Any):
+        self.client = client
+        self._index: Dict[_Key, Dict[_Waiter, None]] = {}
+        self._observed: Set[str] = set()
+        self._heap: List[Tuple[float, int, _Waiter]] = []
+        self._counter = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._pending = 0
+
+    async def wait(
+        self,
+        event_type: str,
+        peer_id: Optional[int] = None,
+        sender_id: Optional[int] = None,
+        check: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        if event_type not in self._observed:
+            self._observed.add(event_type)
+            self.client._observe(event_type, lambda payload, self_id: self._on_event(event_type, payload))
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter((event_type, peer_id, sender_id), check, loop.create_future())
+        self._index.setdefault(waiter.key, {})[waiter] = None
+        self._pending += 1
+        if timeout is not None:
+            heapq.heappush(self._heap, (loop.time() + timeout, next(self._counter), waiter))
+            if self._heap[0][2] is waiter:
+                self._schedule()
+        try:
+            return await waiter.future
+        finally:
+            self._remove(waiter)
+
+    def pending(self) -> int:
+        """等待中的数量"""
+        return self._pending
+
+    def close(self):
+        """取消全部等待"""
+        for bucket in list(self._index.values()):
+            for waiter in list(bucket):
+                waiter.future.cancel()
+        self._heap.clear()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _on_event(self, event_type: str, payload: Dict[str, Any]):
+        if not self._index:
+            return
+        peer_id = payload.get("peer_id", payload.get("group_id"))
+        sender_id = payload.get("sender_id", payload.get("user_id"))
+        keys = dict.fromkeys((
+            (event_type, peer_id, sender_id),
+            (event_type, peer_id, None),
+            (event_type, None, sender_id),
+            (event_type, None, None),
+        ))
+        for key in keys:
+            bucket = self._index.get(key)
+            if not bucket:
+                continue
+            for waiter in list(bucket):
+                if waiter.future.done():
+                    continue
+                try:
+                    if waiter.check is not None and not waiter.check(payload):
+                        continue
+                except Exception as e:
+                    waiter.future.set_exception(e)
+                    continue
+                waiter.future.set_result(payload)
+
+    def _remove(self, waiter: _Waiter):
+        bucket = self._index.get(waiter.key)
+        if bucket is not None:
+            bucket.pop(waiter, None)
+            if not bucket:
+                del self._index[waiter.key]
+        self._pending -= 1
+        if len(self._heap) > 2 * self._pending + 64:
+            # 已完成的等待者留在堆中直到截止时间，数量过多时重建
+            self._heap = [entry for entry in self._heap if not entry[2].future.done()]
+            heapq.heapify(self._heap)
+
+    def _schedule(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._heap:
+            deadline = self._heap[0][0]
+            self._timer = asyncio.get_running_loop().call_at(deadline, self._expire, deadline)
+
+    def _expire(self, deadline: float):
+        self._timer = None
+        # 定时器可能在截止时间前的一个时钟精度内触发
+        now = max(asyncio.get_running_loop().time(), deadline)
+        while self._heap and (self._heap[0][0] <= now or self._heap[0][2].future.done()):
+            _, _, waiter = heapq.heappop(self._heap)
+            if not waiter.future.done():
+                waiter.future.set_exception(asyncio.TimeoutError())
+        self._schedule()
@@ -0,0 +1,75 @@
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from milkypy.columnar import EntityTable, StringPool
+
+ROLES = ["member"] * 18 + ["admin", "owner"]
+SEXES = ["male", "female", "unknown"]
+
+def make_member_list(group_id, size, rng, user_pool):
+    members = []
+    for user_id in rng.sample(user_pool, size):
+        member = {
+            "user_id": user_id,
+            "nickname": f"用户{user_id % 100000}",
+            "sex": rng.choice(SEXES),
+            "group_id": group_id,
+            "card": f"名片{user_id % 5000}" if rng.random() < 0.4 else "",
+            "title": "",
+            "level": rng.randint(1, 100),
+            "role": rng.choice(ROLES),
+            "join_time": 1600000000 + rng.randint(0, 10**8),
+            "last_sent_time": 1700000000 + rng.randint(0, 10**7),
+        }
+        if rng.random() < 0.02:
+            member["shut_up_end_time"] = 1800000000
+        members.append(member)
+    # Round-trip through JSON so the dicts look like real API responses
+    return json.dumps({"members": members}, ensure_ascii=False)
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    data = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return data, current
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory of dict lists and EntityTable for member lists")
+    parser.add_argument("--groups", type=int, default=300)
+    parser.add_argument("--members", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    user_pool = [rng.randint(10000, 4000000000) for _ in range(args.members * 20)]
+    payloads = [make_member_list(group_id, args.members, rng, user_pool) for group_id in range(args.groups)]
+
+    def build_dicts():
+        return [json.loads(payload)["members"] for payload in payloads]
+
+    def build_tables():
+        pool = StringPool()
+        return [EntityTable.from_rows(json.loads(payload)["members"], "user_id", pool) for payload in payloads]
+
+    dicts, dict_bytes = measure(build_dicts)
+    del dicts
+    tables, table_bytes = measure(build_tables)
+
+    rows = args.groups * args.members
+    print(f"{args.groups} groups x {args.members} members = {rows} rows")
+    print(f"list of dicts : {dict_bytes / 2**20:8.1f} MiB ({dict_bytes / rows:6.1f} B/row)")
+    print(f"EntityTable   : {table_bytes / 2**20:8.1f} MiB ({table_bytes / rows:6.1f} B/row)")
+    print(f"ratio         : {dict_bytes / table_bytes:8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from milkypy import MilkyClient, Video
+from milkypy.media import StreamedFile
+
+RESPONSE = json.dumps({"status": "ok", "retcode": 0, "data": {"message_seq": 1, "time": 0}}).encode()
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    # Minimal HTTP/1.1 server that discards request bodies
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            headers = dict(
+                line.split(": ", 1) for line in head.decode("latin-1").split("\r\n")[1:] if ": " in line
+            )
+            remaining = int(headers.get("content-length", headers.get("Content-Length", "0")))
+            while remaining:
+                chunk = await reader.read(min(remaining, 1 << 20))
+                if not chunk:
+                    return
+                remaining -= len(chunk)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(RESPONSE)}\r\n\r\n".encode()
+                + RESPONSE
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def run(mode: str, path: str, concurrency: int) -> float:
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    client = MilkyClient("127.0.0.1", port)
+
+    async def send():
+        if mode == "base64":
+            with open(path, "rb") as f:
+                uri = "base64://" + base64.b64encode(f.read()).decode()
+        else:
+            uri = StreamedFile(path)
+        await client.send_group_message(1, [Video(uri)])
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await asyncio.gather(*(send() for _ in range(concurrency)))
+    elapsed = loop.time() - start
+    await client.stop()
+    server.close()
+    return elapsed
+
+def child(mode: str, path: str, concurrency: int):
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    elapsed = asyncio.run(run(mode, path, concurrency))
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"baseline_kib": baseline, "peak_kib": peak, "elapsed": elapsed}))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare peak RSS of base64 strings and streamed request bodies")
+    parser.add_argument("--size-mb", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--child", choices=["base64", "stream"])
+    parser.add_argument("--path")
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.path, args.concurrency)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "video.bin")
+        with open(path, "wb") as f:
+            for _ in range(args.size_mb):
+                f.write(os.urandom(1 << 20))
+
+        print(f"{args.concurrency} concurrent sends of a {args.size_mb} MiB file")
+        for mode in ("base64", "stream"):
+            # Each mode runs in a fresh process so ru_maxrss reflects only that mode
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", mode, "--path", path,
+                 "--concurrency", str(args.concurrency)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output)
+            growth = (result["peak_kib"] - result["baseline_kib"]) / 1024
+            print(f"{mode:7}: peak RSS {result['peak_kib'] / 1024:7.1f} MiB "
+                  f"(+{growth:6.1f} MiB), {result['elapsed']:.2f}s")
+
+if __name__ == "__main__":
+    main()
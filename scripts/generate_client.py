@@ -11,6 +11,7 @@ import httpx
 import websockets
 from websockets.exceptions import ConnectionClosed
 
+from .columnar import EntityTable
 from .message import Text
 
 logger = logging.getLogger("milkypy")
@@ -117,6 +118,19 @@ class MilkyClient:
 
     # Helper methods for common APIs"""
 
+# Everything above this marker in milkypy/client.py is maintained by hand
+HEADER_MARKER = "    # Helper methods for common APIs"
+
+# List APIs that can optionally return a compact EntityTable: operation id -> (list field, key field)
+COMPACT_LISTS = {
+    "get_friend_list": ("friends", "user_id"),
+    "get_group_list": ("groups", "group_id"),
+    "get_group_member_list": ("members", "user_id"),
+}
+
+# Send APIs that accept an idempotency key (see milkypy.idempotency)
+IDEMPOTENT_SENDS = ("send_private_message", "send_group_message")
+
 TYPE_MAPPING = {
     "string": "str",
     "integer": "int",
@@ -237,6 +251,16 @@ def generate_method(path, path_item, root):
         else:
             param_docs.append(f"{prop_name}")
 
+    compact = COMPACT_LISTS.get(operation_id)
+    if compact:
+        args_list.append("compact: bool = False")
+        param_docs.append("compact: 是否将列表转换为紧凑的列式表 (EntityTable) 返回")
+
+    idempotent = operation_id in IDEMPOTENT_SENDS
+    if idempotent:
+        args_list.append("idempotency_key: Optional[str] = None")
+        param_docs.append("idempotency_key: 幂等键，同一个键的重复调用只会发送一次消息")
+
     args_str = ", ".join(args_list)
     if args_str:
         args_str = ", " + args_str
@@ -323,17 +347,36 @@ def generate_method(path, path_item, root):
         dict_items.append(f'"{arg}": {arg}')
     
     dict_str = ", ".join(dict_items)
+    target = "data = " if compact else "return "
+    extra = ", idempotency_key=idempotency_key" if idempotent else ""
     if len(dict_items) > 1:
         # formatting for multiple args
-        body.append(f'        return await self.call_api("{operation_id}", {{')
+        body.append(f'        {target}await self.call_api("{operation_id}", {{')
         for arg in call_args:
              body.append(f'            "{arg}": {arg},')
-        body.append('        })')
+        body.append(f'        }}{extra})')
     else:
-        body.append(f'        return await self.call_api("{operation_id}", {{{dict_str}}})')
+        body.append(f'        {target}await self.call_api("{operation_id}", {{{dict_str}}}{extra})')
+
+    if compact:
+        list_field, key_field = compact
+        body.append('        if compact:')
+        body.append(f'            data["{list_field}"] = EntityTable.from_rows(data["{list_field}"], "{key_field}")')
+        body.append('        return data')
 
     return "\n".join(body)
 
+def load_header(output_path):
+    # Reuse the hand-written part of an existing client.py so that
+    # regenerating only refreshes the API helper methods
+    if os.path.exists(output_path):
+        with open(output_path, "r", encoding="utf-8") as f:
+            existing = f.read()
+        index = existing.find(HEADER_MARKER)
+        if index != -1:
+            return existing[:index + len(HEADER_MARKER)]
+    return HEADER
+
 def main():
     if os.path.exists("openapi.json"):
         path = "openapi.json"
@@ -356,12 +399,12 @@ def main():
             if method_code:
                 methods.append(method_code)
                 
-    content = HEADER + "\n\n" + "\n\n".join(methods) + "\n"
-    
     # Write to milkypy/client.py
     output_path = "milkypy/client.py"
     if not os.path.exists("milkypy") and os.path.exists("../milkypy"):
          output_path = "../milkypy/client.py"
+
+    content = load_header(output_path) + "\n\n" + "\n\n".join(methods) + "\n"
          
     with open(output_path, "w", encoding="utf-8") as f:
         f.write(content)
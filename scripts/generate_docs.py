@@ -12,7 +12,7 @@ HEADER = """# MilkyPy API 参考文档
 
 ## 核心生命周期
 
-### `MilkyClient(host, port=3010, token=None, api_port=None, event_port=None)`
+### `MilkyClient(host, port=3010, token=None, api_port=None, event_port=None, record_path=None, event_queue_size=None, overflow_policies=None, default_overflow_policy="block", event_workers=1, recent_messages=2048, shared_filesystem=False, staging_dir=None)`
 初始化客户端。
 - **参数**:
     - `host`: 协议端 IP 地址。
@@ -20,19 +20,51 @@ HEADER = """# MilkyPy API 参考文档
     - `token`: 鉴权 Token（可选）。
     - `api_port`: 单独指定 HTTP API 的端口（可选）。
     - `event_port`: 单独指定 WebSocket 事件推送的端口（可选）。
+    - `record_path`: 事件录制日志路径（可选），详见 [进阶功能](advanced.md)。
+    - `event_queue_size`: 有界事件队列容量（可选），不设置时在读取循环中直接处理事件。
+    - `overflow_policies`: 按事件类型配置的队列溢出策略（可选）。
+    - `default_overflow_policy`: 未配置事件类型的溢出策略，默认为 `"block"`。
+    - `event_workers`: 消费事件队列的工作协程数量，默认为 `1`。
+    - `recent_messages`: 最近消息缓存的容量，默认为 `2048`，为 `0` 时不启用。
+    - `shared_filesystem`: 协议端是否与客户端共享文件系统（可以直接读取客户端的本地文件），默认为 `False`。
+    - `staging_dir`: 共享文件系统时 `bytes` 媒体的暂存目录（可选），默认为临时目录。
 
 ### `run()`
 启动客户端并建立 WebSocket 连接。这是一个阻塞调用，通常作为程序的入口。
 - **示例**: `await bot.run()`
 
+### `start()` / `stop(timeout=10.0)`
+在后台启动客户端，以及优雅地停止客户端。`stop` 会依次停止接收事件、等待已接收的事件与批次处理完毕、等待进行中的 API 调用返回，最后关闭 HTTP 连接池；超过 `timeout` 秒仍未完成的任务将被取消。
+- **示例**:
+```python
+async with MilkyClient(host="127.0.0.1") as bot:
+    await shutdown_requested.wait()
+```
+
+### `on_connect` / `on_disconnect`
+注册连接建立与断开的钩子，签名为 `hook(client)`。`on_connect` 钩子在后台运行，不阻塞事件接收。
+- **示例**:
+```python
+@bot.on_connect
+async def warm_up(self: MilkyClient):
+    await self.get_login_info()
+```
+
+### `wait_for(event_type, peer_id=None, sender_id=None, check=None, timeout=None)`
+等待下一个符合条件的事件并返回其负载，超时时抛出 `asyncio.TimeoutError`。`stop()` 时全部等待被取消。
+- **示例**:
+```python
+answer = await bot.wait_for("message_receive", peer_id=group_id, sender_id=user_id, timeout=60)
+```
+
 ---
 """
 
 FOOTER = """
 ## 低级调用
 
-### `call_api(action: str, params: dict = None)`
-调用 Milky 协议定义的任意 API（别名方法，等同于 `call_api_http`）。
+### `call_api(action: str, params: dict = None, idempotency_key: str = None)`
+调用 Milky 协议定义的任意 API（别名方法，等同于 `call_api_http`）。传入 `idempotency_key` 时按幂等发送处理，参见进阶文档。
 
 ### `call_api_http(action: str, params: dict = None)`
 通过 HTTP 直接调用 Milky 协议定义的任意 API。
@@ -55,8 +87,18 @@ MilkyPy 提供了一系列辅助函数来帮助你构造消息段。你可以将
 - `Video(uri: str, thumb_uri: str = None)`: 构造视频消息段。
 - `Forward(messages: List[dict])`: 构造合并转发消息段。
 
+### 消息段对象与 `Message`
+- `TextSegment`、`MentionSegment`、`MentionAllSegment`、`FaceSegment`、`ReplySegment`、`ImageSegment`、`RecordSegment`、`VideoSegment`、`ForwardSegment`: 参数与上面的函数相同的不可修改消息段对象（使用 `__slots__`），`to_dict()` 返回与对应函数相同的 dict。
+- `Message(*parts)`: 由字符串、消息段对象、消息段 dict 组合而成的不可修改消息，相邻的文本会被合并。`freeze()` 将其预先编码为 JSON，发送时编码结果直接拼接进请求体。
+
 """
 
+# List APIs that accept the client-side `compact` option (see generate_client.py)
+COMPACT_LISTS = ("get_friend_list", "get_group_list", "get_group_member_list")
+
+# Send APIs that accept the client-side `idempotency_key` option (see generate_client.py)
+IDEMPOTENT_SENDS = ("send_private_message", "send_group_message")
+
 TYPE_MAPPING = {
     "string": "str",
     "integer": "int",
@@ -216,6 +258,13 @@ def generate_method_doc(path, path_item, root):
             line += f"({py_type})"
         param_lines.append(line)
         
+    if operation_id in COMPACT_LISTS:
+        sig_args.append("compact: bool = False")
+        param_lines.append("    - `compact`: 是否将列表转换为紧凑的列式表 (EntityTable) 返回 (bool)")
+    if operation_id in IDEMPOTENT_SENDS:
+        sig_args.append("idempotency_key: Optional[str] = None")
+        param_lines.append("    - `idempotency_key`: 幂等键，同一个键的重复调用只会发送一次消息 (Optional[str])")
+
     sig_str = ", ".join(sig_args)
     
     # Return value